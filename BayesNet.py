@@ -1,110 +1,382 @@
 import pprint
 from itertools import product
 import numpy as np
-import pandas as pd
+from dataset import *
+from DAG import *
+from profiling import *
 
 
 class BayesNet:
     """
     This class builds a Bayesian Network (bnet) from a DAG (encoded in
-    'arrows') and a dataset (encoded in 'dataset_df').
+    'arrows') and a dataset (encoded either in 'dataset_df' or in
+    'packed_dataset', see dataset.py).
 
     Attributes
     ----------
     arrows: list[(str,str)]
         This is a list of the arrows of the DAG. An arrow in a pair of
         node names.
-    dataset_df: pd.DataFrame
+    dataset_df: pd.DataFrame | None
         A pandas DataFrame wherein the columns are the node names and the rows
-        are integers that label DAGs in a cbLibX.
+        are integers that label DAGs in a cbLibX. This is the DataFrame
+        the bnet was built from; it is not changed by update() and remove().
+    packed_dataset: np.array[uint8]
+        The rows the bnet was built from, packed with 8 columns per byte
+        (see dataset.py). If 'dataset_df' is given, this is built from it.
+        It is not changed by update() and remove(), which only change the
+        counts, so no rows are kept for a stream of updates.
+    col_to_index: dict[str, int]
+        dictionary mapping column name to column index in 'packed_dataset'
+    num_rows: int
+        number of rows of the dataset, including the rows added by update()
+        and excluding those removed by remove()
     nd_to_TPM: dict[str, dict()]
         dictionary mapping node name to TPM (transition probability matrix)
         of the node.
+    dag: DAG
+        the DAG, with its adjacency dictionaries and topological order
     nd_to_parents: dict[str, list[str]]
         dictionary mapping node to list of parents.
     nodes: list[str]
         list of all node names of DAG
+    pseudo_count: float
+        pseudo-count added to every count when estimating the TPMs (
+        Laplace smoothing if pseudo_count=1)
+    counts_cache: dict[(str, tuple(str)), np.array[int]]
+        dictionary mapping a family (node, tuple of its parents) to its
+        counts (see get_counts()). These counts are sufficient statistics
+        for the TPM of the node, so they only have to be computed once per
+        family. The same cache can be shared by several BayesNets built
+        from the same dataset, e.g., by the bnets for different arrow
+        repetition thresholds, so that each one only computes the counts
+        of its new families. update() and remove() are per bnet: the first
+        call replaces the shared cache by a private copy holding only the
+        families of this bnet, so the other bnets sharing the cache are
+        not affected.
+    has_private_cache: bool
+        True iff 'counts_cache' is the private copy made by update() or
+        remove()
 
     """
 
-    def __init__(self, arrows, dataset_df):
+    @profiled("BayesNet")
+    def __init__(self, arrows, dataset_df=None,
+                 packed_dataset=None, columns=None,
+                 pseudo_count=0, counts_cache=None):
         """
+        Either 'dataset_df' or both 'packed_dataset' and 'columns' must be
+        given. The second option doesn't require pandas.
 
         Parameters
         ----------
         arrows: list[(str,str)]
-        dataset_df: pd.DataFrame
+        dataset_df: pd.DataFrame | None
+        packed_dataset: np.array[uint8] | None
+        columns: list[str] | None
+            names of the columns of 'packed_dataset'
+        pseudo_count: float
+        counts_cache: dict[(str, tuple(str)), np.array[int]] | None
+            cache to (re)use. If None, a new empty cache is created. It
+            must have been filled from the same dataset.
         """
         self.arrows = arrows
         self.dataset_df = dataset_df
-        self.nodes = []
-        self.nd_to_parents = {}
+        if dataset_df is not None:
+            columns = list(dataset_df.columns)
+            packed_dataset = pack_dataset(dataset_df.to_numpy())
+        assert packed_dataset is not None and columns is not None
+        self.packed_dataset = packed_dataset
+        self.col_to_index = {col: i for i, col in enumerate(columns)}
+        self.num_rows = len(packed_dataset)
+        self.pseudo_count = pseudo_count
+        if counts_cache is None:
+            counts_cache = {}
+        self.counts_cache = counts_cache
+        self.has_private_cache = False
+        self.dag = DAG(arrows)
+        assert not self.dag.has_cycle(), "arrows have a cycle"
+        self.nodes = self.dag.nodes
+        self.nd_to_parents = self.dag.nd_to_parents
         self.nd_to_TPM = {}
-        for arrow in arrows:
-            for i in [0, 1]:
-                if arrow[i] not in self.nodes:
-                    self.nodes.append(arrow[i])
-        self.nd_to_parents = {nd: [] for nd in self.nodes}
-        for arrow in arrows:
-            for nd in self.nodes:
-                # print("nnbbcc", arrow, nd)
-                if arrow[1] == nd:
-                    if arrow[0] not in self.nd_to_parents[nd]:
-                        self.nd_to_parents[nd].append(arrow[0])
-        # print("llkkjj", self.nd_to_parents)
         for nd in self.nodes:
             self.nd_to_TPM[nd] = self.get_TPM(nd)
 
-    def get_TPM(self, nd):
+    def get_column(self, nd, packed_rows):
+        """
+        This method returns the column for node 'nd' of the packed rows
+        'packed_rows'.
+
+        Parameters
+        ----------
+        nd: str
+        packed_rows: np.array[uint8]
+
+        Returns
+        -------
+        np.array[int64]
+
+        """
+        return unpack_dataset_column(
+            packed_rows, self.col_to_index[nd]).astype(np.int64)
+
+    def count_family(self, nd, parents, packed_rows):
+        """
+        This method returns the counts (see get_counts()) for the node 'nd'
+        and its parents 'parents' in the packed rows 'packed_rows'.
+
+        Parameters
+        ----------
+        nd: str
+        parents: list[str]
+        packed_rows: np.array[uint8]
+
+        Returns
+        -------
+        np.array[int]
+
+        """
+        num_parents = len(parents)
+        pa_st_indices = np.zeros((len(packed_rows),), dtype=np.int64)
+        for pa_nd in parents:
+            pa_st_indices = 2*pa_st_indices + \
+                self.get_column(pa_nd, packed_rows)
+        nd_vals = self.get_column(nd, packed_rows)
+        counts = np.bincount(2*pa_st_indices + nd_vals,
+                             minlength=2**(num_parents + 1))
+        return counts.reshape((2**num_parents, 2))
+
+    def get_counts(self, nd):
+        """
+        This method returns the empirical counts for the node 'nd' and its
+        parents. Each row of the dataset is assigned an integer index
+        encoding the state of the parents of 'nd' (the first parent is the
+        most significant bit, so the indices follow the order of
+        itertools.product((0, 1), repeat=num_parents)). All the counts are
+        then built with a single np.bincount() pass. The counts are
+        computed only once per family and stored in 'counts_cache'.
+
+        Parameters
+        ----------
+        nd: str
+
+        Returns
+        -------
+        np.array[int]
+            array of shape (2^num_parents, 2). Entry [i, nd_st] is the number
+            of rows in which the parents are in their i-th state and 'nd' is
+            in state 'nd_st'.
+
+        """
+        family = (nd, tuple(self.nd_to_parents[nd]))
+        if family not in self.counts_cache:
+            # all the families are counted by __init__(), before any
+            # update() or remove()
+            assert not self.has_private_cache
+            self.counts_cache[family] = self.count_family(
+                nd, self.nd_to_parents[nd], self.packed_dataset)
+        return self.counts_cache[family]
+
+    def get_TPM(self, nd, as_array=False):
         """
         This method returns the empirical TPM for the node 'nd'. The TPM is
         expressed as a dictionary mapping a binary n-tuple representing a
         state of the parents to a pair of floats that add to 1 and give the
         probability of the node 'nd' being in state 0 for the first float
-        and state 1 for the second float.
+        and state 1 for the second float. The probabilities are estimated
+        from the counts plus 'pseudo_count'. Parent states with no counts
+        at all (they never occur in the dataset and pseudo_count=0) are
+        mapped to the uniform distribution [.5, .5] instead of [nan, nan].
 
         Parameters
         ----------
         nd: str
+        as_array: bool
+            True iff want the TPM returned as a dense array of shape (
+            2^num_parents, 2) instead of a dictionary. Row i of the array
+            corresponds to the i-th parent state in the order of
+            itertools.product((0, 1), repeat=num_parents).
 
         Returns
         -------
-        pa_st_to_prob_of_nd_st: dict(tuple(str), np.array[float, float])
+        pa_st_to_prob_of_nd_st: dict(tuple(int), np.array[float, float])
+            or np.array[float] if as_array=True
 
         """
+        counts = self.get_counts(nd) + self.pseudo_count
+        totals = counts.sum(axis=1, keepdims=True)
+        probs = np.full(counts.shape, .5)
+        np.divide(counts, totals, out=probs, where=totals > 0)
+        if as_array:
+            return probs
         num_parents = len(self.nd_to_parents[nd])
-        num_rows = len(self.dataset_df.index)
-        # product() iterator destroyed after first use
-        pa_sts = list(product((0, 1), repeat=num_parents))
-        pa_st_to_prob_of_nd_st = {pa_st: np.zeros((2,))
-                                  for pa_st in pa_sts}
-        den_indi_fun = {pa_st: np.zeros((2,))
-                        for pa_st in pa_sts}
-        num_ind_fun = {pa_st: np.zeros((2,))
-                       for pa_st in pa_sts}
-        for pa_st in pa_sts:
-            for nd_st in [0, 1]:
-                for row in range(num_rows):
-                    # print("ccdff", nd_st)
-                    parents = self.nd_to_parents[nd]
-                    bool_list = [pa_st[parents.index(pa_nd)]
-                                 == self.dataset_df.loc[row, pa_nd] for
-                                 pa_nd in self.nd_to_parents[nd]]
-                    # print("kkjju", bool_list)
-                    if len(bool_list) != 0:
-                        den_indi_fun[pa_st][nd_st] += int(all(bool_list))
-                    # list1.append() returns None
-                    bool_list.append(nd_st == self.dataset_df.loc[row, nd])
-                    # print("9999", bool_list)
-                    num_ind_fun[pa_st][nd_st] += int(all(bool_list))
-        for nd_st in [0, 1]:
-            if len(pa_sts) == 0:
-                pa_st_to_prob_of_nd_st[tuple()][nd_st] =\
-                    num_ind_fun[tuple()][nd_st]
-            for pa_st in pa_sts:
-                pa_st_to_prob_of_nd_st[pa_st][nd_st] = \
-                    num_ind_fun[pa_st][nd_st]/den_indi_fun[pa_st][nd_st]
-        return pa_st_to_prob_of_nd_st
+        pa_sts = product((0, 1), repeat=num_parents)
+        return {pa_st: probs[i] for i, pa_st in enumerate(pa_sts)}
+
+    def pack_rows(self, rows_df, packed_rows):
+        """
+        This method returns the rows given either as the DataFrame
+        'rows_df' or as the packed array 'packed_rows' (in which case they
+        are returned as is), packed with the same columns as the dataset.
+
+        Parameters
+        ----------
+        rows_df: pd.DataFrame | None
+        packed_rows: np.array[uint8] | None
+
+        Returns
+        -------
+        np.array[uint8]
+
+        """
+        if rows_df is not None:
+            packed_rows = pack_dataset(
+                rows_df[list(self.col_to_index)].to_numpy())
+        assert packed_rows is not None
+        return packed_rows
+
+    def add_counts(self, packed_rows, sign):
+        """
+        This method adds (sign=1) or subtracts (sign=-1) the counts of the
+        rows 'packed_rows' to the counts of the families of this bnet, and
+        then refreshes 'nd_to_TPM'. On the first call, 'counts_cache' is
+        replaced by a private copy holding only the families of this bnet
+        (see the class docstring). Nothing is changed if a count would
+        become negative, i.e., if rows that are not in the dataset are
+        removed.
+
+        Parameters
+        ----------
+        packed_rows: np.array[uint8]
+        sign: int
+
+        Returns
+        -------
+        None
+
+        """
+        families = [(nd, tuple(self.nd_to_parents[nd])) for nd in self.nodes]
+        new_counts = [self.counts_cache[family] +
+                      sign * self.count_family(family[0], family[1],
+                                               packed_rows)
+                      for family in families]
+        assert all((counts >= 0).all() for counts in new_counts), \
+            "removed rows are not in the dataset"
+        if not self.has_private_cache:
+            self.counts_cache = {}
+            self.has_private_cache = True
+        self.counts_cache.update(zip(families, new_counts))
+        self.num_rows += sign * len(packed_rows)
+        for nd in self.nodes:
+            self.nd_to_TPM[nd] = self.get_TPM(nd)
+
+    def update(self, rows_df=None, packed_rows=None):
+        """
+        This method adds new rows, given either as a DataFrame or packed,
+        to the dataset, and refreshes 'nd_to_TPM'. It takes O(number of new
+        rows) time, because only the counts of the new rows are computed.
+
+        Parameters
+        ----------
+        rows_df: pd.DataFrame | None
+        packed_rows: np.array[uint8] | None
+
+        Returns
+        -------
+        None
+
+        """
+        self.add_counts(self.pack_rows(rows_df, packed_rows), 1)
+
+    def remove(self, rows_df=None, packed_rows=None):
+        """
+        This method removes rows, given either as a DataFrame or packed,
+        from the dataset, and refreshes 'nd_to_TPM'. The rows must be in the
+        dataset. Like update(), it takes O(number of removed rows) time,
+        and the removed rows are not kept.
+
+        Parameters
+        ----------
+        rows_df: pd.DataFrame | None
+        packed_rows: np.array[uint8] | None
+
+        Returns
+        -------
+        None
+
+        """
+        self.add_counts(self.pack_rows(rows_df, packed_rows), -1)
+
+    def sample(self, num_samples, seed=None):
+        """
+        This method draws 'num_samples' samples from the bnet at once,
+        by ancestral sampling: the nodes are visited in topological order,
+        and all the samples of a node are drawn together from the rows of
+        its TPM (as returned by get_TPM(as_array=True)) selected by the
+        samples of its parents.
+
+        Parameters
+        ----------
+        num_samples: int
+        seed: int | None
+            seed of the numpy random generator
+
+        Returns
+        -------
+        np.array[uint8]
+            array of shape (num_samples, len(self.nodes)). Column j gives
+            the samples of node self.nodes[j].
+
+        """
+        rng = np.random.default_rng(seed)
+        nd_to_col = {nd: j for j, nd in enumerate(self.nodes)}
+        samples = np.zeros((num_samples, len(self.nodes)), dtype=np.uint8)
+        for nd in self.dag.topological_order:
+            pa_st_indices = np.zeros((num_samples,), dtype=np.int64)
+            for pa_nd in self.nd_to_parents[nd]:
+                pa_st_indices = 2*pa_st_indices + samples[:, nd_to_col[pa_nd]]
+            prob_of_1 = self.get_TPM(nd, as_array=True)[pa_st_indices, 1]
+            samples[:, nd_to_col[nd]] = rng.random(num_samples) < prob_of_1
+        return samples
+
+    def get_log_likelihood(self, matrix, columns, per_row=False):
+        """
+        This method returns the log-likelihood, under the bnet, of the
+        dataset with matrix 'matrix' (for example, one returned by
+        dataset.get_dataset_matrix() or by sample()) and column names
+        'columns'. The columns must include all the nodes of the bnet. The
+        log-probabilities of all the rows are computed at once, one node at
+        a time, from the TPMs returned by get_TPM(as_array=True).
+
+        Parameters
+        ----------
+        matrix: np.array[int]
+            array of shape (num_rows, len(columns))
+        columns: list[str]
+        per_row: bool
+            True iff want the log-likelihood of each row instead of their
+            sum
+
+        Returns
+        -------
+        float or np.array[float] if per_row=True
+
+        """
+        matrix = np.asarray(matrix, dtype=np.int64)
+        col_to_index = {col: j for j, col in enumerate(columns)}
+        log_probs = np.zeros((len(matrix),))
+        for nd in self.nodes:
+            pa_st_indices = np.zeros((len(matrix),), dtype=np.int64)
+            for pa_nd in self.nd_to_parents[nd]:
+                pa_st_indices = 2*pa_st_indices + \
+                    matrix[:, col_to_index[pa_nd]]
+            probs = self.get_TPM(nd, as_array=True)[
+                pa_st_indices, matrix[:, col_to_index[nd]]]
+            with np.errstate(divide='ignore'):
+                log_probs += np.log(probs)
+        if per_row:
+            return log_probs
+        return float(log_probs.sum())
 
     def print(self):
         """
@@ -0,0 +1,167 @@
+from string import ascii_letters
+import numpy as np
+from BayesNet import *
+
+
+class BayesNetInference:
+    """
+    This class does exact inference, by variable elimination, for a bnet
+    built by the class BayesNet. It answers queries of the form P(nd |
+    evidence), where 'evidence' fixes the states of some of the nodes.
+
+    Each node is given a factor, which is its TPM as an np.array with one
+    axis (of dimension 2) per parent and a last axis for the node itself.
+    Evidence on a node is an extra factor, a one-hot vector, on the axis of
+    that node. The product of all the factors is then summed over every
+    node except the query node, using np.einsum(). The order in which
+    np.einsum() multiplies the factors and sums out the nodes is the
+    elimination order. It is computed with np.einsum_path() only once per
+    evidence pattern (query node plus evidence nodes) and then cached.
+
+    Queries can be batched: for a fixed evidence pattern, the states of
+    the evidence nodes can be given for many evidence rows at once. The
+    one-hot evidence factors then get an extra batch axis, and all the
+    rows are answered by a single np.einsum() call.
+
+    The factors are built from the TPMs when the object is created, so a
+    new object must be created after calling BayesNet.update() or
+    BayesNet.remove().
+
+    Attributes
+    ----------
+    bnet: BayesNet
+    nd_to_letter: dict[str, str]
+        dictionary mapping each node to the letter of its axis in the
+        np.einsum() subscripts
+    factors: list[np.array[float]]
+        the TPM of each node, as a factor
+    factor_subscripts: list[str]
+        the np.einsum() subscripts of each factor
+    pattern_to_path: dict[(str, tuple(str)), list]
+        dictionary mapping an evidence pattern (query node, tuple of
+        evidence nodes) to its cached contraction path
+        (elimination order)
+
+    """
+
+    # letter of the batch axis
+    BATCH_LETTER = ascii_letters[-1]
+
+    def __init__(self, bnet):
+        """
+
+        Parameters
+        ----------
+        bnet: BayesNet
+        """
+        assert len(bnet.nodes) < len(ascii_letters)
+        self.bnet = bnet
+        self.nd_to_letter = {nd: ascii_letters[i]
+                             for i, nd in enumerate(bnet.nodes)}
+        self.factors = []
+        self.factor_subscripts = []
+        for nd in bnet.nodes:
+            parents = bnet.nd_to_parents[nd]
+            self.factors.append(bnet.get_TPM(nd, as_array=True).reshape(
+                (2,) * (len(parents) + 1)))
+            self.factor_subscripts.append(
+                ''.join(self.nd_to_letter[pa_nd] for pa_nd in parents) +
+                self.nd_to_letter[nd])
+        self.pattern_to_path = {}
+
+    def query_batch(self, nd, evidence_nodes, evidence_values):
+        """
+        This method returns P(nd | evidence) for many evidence rows at
+        once. Evidence row i sets the node evidence_nodes[j] to the state
+        evidence_values[i, j].
+
+        Parameters
+        ----------
+        nd: str
+        evidence_nodes: list[str]
+        evidence_values: np.array[int]
+            array of shape (num_rows, len(evidence_nodes))
+
+        Returns
+        -------
+        np.array[float]
+            array of shape (num_rows, 2). Row i gives the probabilities of
+            'nd' being in state 0 and 1 given evidence row i. Rows whose
+            evidence has probability zero are [nan, nan].
+
+        """
+        evidence_values = np.asarray(evidence_values, dtype=np.int64)
+        num_rows = len(evidence_values)
+        if not evidence_nodes:
+            return np.tile(self.get_marginal(nd), (num_rows, 1))
+        b = self.BATCH_LETTER
+        operands = list(self.factors)
+        subscripts = list(self.factor_subscripts)
+        for j, ev_nd in enumerate(evidence_nodes):
+            operands.append(np.eye(2)[evidence_values[:, j]])
+            subscripts.append(b + self.nd_to_letter[ev_nd])
+        expr = ','.join(subscripts) + '->' + b + self.nd_to_letter[nd]
+        pattern = (nd, tuple(evidence_nodes))
+        if pattern not in self.pattern_to_path:
+            self.pattern_to_path[pattern] = \
+                np.einsum_path(expr, *operands, optimize='greedy')[0]
+        joint = np.einsum(expr, *operands,
+                          optimize=self.pattern_to_path[pattern])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return joint / joint.sum(axis=1, keepdims=True)
+
+    def query(self, nd, evidence=None):
+        """
+        This method returns P(nd | evidence) for a single evidence.
+
+        Parameters
+        ----------
+        nd: str
+        evidence: dict[str, int] | None
+            dictionary mapping each evidence node to its state
+
+        Returns
+        -------
+        np.array[float, float]
+
+        """
+        if not evidence:
+            return self.get_marginal(nd)
+        evidence_nodes = list(evidence)
+        return self.query_batch(
+            nd, evidence_nodes,
+            [[evidence[ev_nd] for ev_nd in evidence_nodes]])[0]
+
+    def get_marginal(self, nd):
+        """
+        This method returns the marginal probability P(nd).
+
+        Parameters
+        ----------
+        nd: str
+
+        Returns
+        -------
+        np.array[float, float]
+
+        """
+        expr = ','.join(self.factor_subscripts) + '->' + \
+            self.nd_to_letter[nd]
+        pattern = (nd, ())
+        if pattern not in self.pattern_to_path:
+            self.pattern_to_path[pattern] = \
+                np.einsum_path(expr, *self.factors, optimize='greedy')[0]
+        marginal = np.einsum(expr, *self.factors,
+                             optimize=self.pattern_to_path[pattern])
+        return marginal / marginal.sum()
+
+    def get_marginals(self):
+        """
+        This method returns the marginal probabilities of all the nodes.
+
+        Returns
+        -------
+        dict[str, np.array[float, float]]
+
+        """
+        return {nd: self.get_marginal(nd) for nd in self.bnet.nodes}
@@ -0,0 +1,522 @@
+import json
+from cb import *
+from events import *
+from event_vocab import *
+from profiling import *
+
+"""This file contains an indexed version of the collection of cbLibXs built
+by cb.create_coll_of_cbLibXs(). """
+
+
+def get_before_pairs(ids, times):
+    """
+    This method returns the set of all the pairs (id1, id2) of event ids of
+    an encoded cb (ids, times) (see event_vocab.py) such that id1 occurs in
+    an earlier frame than id2.
+
+    Parameters
+    ----------
+    ids: list[int]
+    times: list[int]
+
+    Returns
+    -------
+    set[(int, int)]
+
+    """
+    return {(ids[i], ids[j])
+            for j in range(len(ids)) for i in range(j)
+            if times[i] < times[j]}
+
+
+class CbLibXColl:
+    """
+    This class maintains a collection of cbLibXs (see
+    cb.create_coll_of_cbLibXs()) together with two indices that make adding
+    a new cb cheap:
+
+    1. a hash set of all the cbs added so far, so that checking whether a
+    cb has been republished takes O(1) time instead of a scan of every
+    cbLibX.
+
+    2. an inverted index mapping each event to a bitset (a python int) of
+    the cbLibXs whose first cb (its "head") contains that event. ANDing the
+    bitsets of the events of a new cb narrows the cbLibXs that can possibly
+    admit it to the ones whose head contains all its events. Two more
+    indices narrow them further: one maps each ordered pair of events
+    (e1, e2) to a bitset of the heads in which e1 occurs in an earlier
+    frame than e2, and drops the heads in which two consecutive events of
+    the new cb are not in the same order, and one maps each number of
+    events to a bitset of the heads with that number of events, and drops
+    the heads that are not longer than the new cb. Only the few remaining
+    candidates are then checked with
+    event_vocab.encoded_cb1_is_smaller_than_cb2().
+
+    The events are interned by an event_vocab.EventVocab, so the index is
+    keyed by integer ids, and the encoding of each head used by the
+    comparison is built once, when the head is added. Frames can have
+    several events (see frames.py).
+
+    Adding the same cbs in the same order yields exactly the same
+    collection and number of republished cbs as cb.create_coll_of_cbLibXs().
+
+    Optionally, the collection can be kept bounded in memory by spilling
+    "closed" cbLibXs to a file. A cbLibX is closed once it contains all the
+    cbs returned by cb.get_smaller_cbs() for its head, except those that
+    had already been added before the head: after that, it can never admit
+    any new cb. A closed cbLibX is written to the spill file as a JSON line
+    [lib_index, cbLibX], and it is replaced by None in 'coll_of_cbLibXs'
+    and removed from the index. Spilling requires all the cbs added to be
+    completed Tic-Tac-Toe games, which add_cb() asserts.
+
+    Attributes
+    ----------
+    coll_of_cbLibXs: list[list[list[str]] | None]
+        collection (i.e., list) of cbLibXs. Spilled cbLibXs are None.
+    num_republished_cbs: int
+        number of added cbs that had already been added before
+    cb_set: set[tuple(str | tuple(str))]
+        set of all the distinct cbs added so far (see frames.get_cb_key())
+    vocab: EventVocab
+        vocabulary of the events of all the heads
+    event_to_heads: dict[int, int]
+        dictionary mapping an event id to a bitset whose i-th bit is 1 iff
+        the head of the i-th cbLibX contains the event
+    before_to_heads: dict[(int, int), int]
+        dictionary mapping a pair of event ids (id1, id2) to a bitset whose
+        i-th bit is 1 iff id1 occurs in an earlier frame than id2 in the
+        head of the i-th cbLibX
+    num_events_to_heads: dict[int, int]
+        dictionary mapping a number of events to a bitset whose i-th bit
+        is 1 iff the head of the i-th cbLibX has that number of events
+    head_codes: list[(dict[int, int] | None, int)]
+        encoding of the head of each cbLibX (see
+        event_vocab.get_id_to_time()). The dictionary is None if the head
+        has repeated events, in which case it is compared with
+        cb1_is_smaller_that_cb2() instead.
+    spill_file: file object | None
+        file to which closed cbLibXs are spilled, or None if spilling is
+        off
+    lib_to_num_missing_cbs: dict[int, int]
+        dictionary mapping the index of each open cbLibX to the number of
+        cbs it can still admit. Only used if spilling is on.
+
+    """
+
+    def __init__(self, spill_path=None):
+        """
+
+        Parameters
+        ----------
+        spill_path: str | None
+            path of the file to which closed cbLibXs are spilled. If None,
+            nothing is spilled and the whole collection stays in memory.
+        """
+        self.coll_of_cbLibXs = []
+        self.num_republished_cbs = 0
+        self.cb_set = set()
+        self.vocab = EventVocab()
+        self.event_to_heads = {}
+        self.before_to_heads = {}
+        self.num_events_to_heads = {}
+        self.head_codes = []
+        self.spill_file = None
+        if spill_path is not None:
+            self.spill_file = open(spill_path, 'w')
+        self.lib_to_num_missing_cbs = {}
+
+    def get_admitting_heads(self, cb):
+        """
+        This method returns the indices (in increasing order) of all the
+        cbLibXs whose head is larger than 'cb', i.e., of all the cbLibXs
+        that will admit 'cb'.
+
+        Parameters
+        ----------
+        cb: list[str | list[str]]
+
+        Returns
+        -------
+        list[int]
+
+        """
+        ids, times = self.vocab.encode_cb_as_lists(cb)
+        bitset = 0
+        for num_events, heads in self.num_events_to_heads.items():
+            if num_events > len(ids):
+                bitset |= heads
+        for event_id in set(ids):
+            bitset &= self.event_to_heads.get(event_id, 0)
+            if not bitset:
+                return []
+        for j in range(1, len(ids)):
+            if times[j - 1] < times[j]:
+                bitset &= self.before_to_heads.get((ids[j - 1], ids[j]), 0)
+                if not bitset:
+                    return []
+        lib_indices = []
+        while bitset:
+            lowest_bit = bitset & -bitset
+            i = lowest_bit.bit_length() - 1
+            bitset ^= lowest_bit
+            cbLibX = self.coll_of_cbLibXs[i]
+            if cbLibX is None:
+                continue
+            id_to_time, num_events = self.head_codes[i]
+            if id_to_time is None:
+                is_smaller = cb1_is_smaller_that_cb2(cb, cbLibX[0])
+            else:
+                is_smaller = encoded_cb1_is_smaller_than_cb2(
+                    ids, times, id_to_time, num_events)
+            if is_smaller:
+                lib_indices.append(i)
+        return lib_indices
+
+    def add_cbLibX(self, head):
+        """
+        This method appends the new cbLibX [head] to the collection and
+        indexes its head.
+
+        Parameters
+        ----------
+        head: list[str | list[str]]
+
+        Returns
+        -------
+        None
+
+        """
+        bit = 1 << len(self.coll_of_cbLibXs)
+        self.coll_of_cbLibXs.append([head])
+        ids, times = self.vocab.encode_cb_as_lists(head)
+        self.head_codes.append(
+            (get_event_to_time_of_events(ids, times), len(ids)))
+        for event_id in set(ids):
+            self.event_to_heads[event_id] = \
+                self.event_to_heads.get(event_id, 0) | bit
+        for pair in get_before_pairs(ids, times):
+            self.before_to_heads[pair] = \
+                self.before_to_heads.get(pair, 0) | bit
+        self.num_events_to_heads[len(ids)] = \
+            self.num_events_to_heads.get(len(ids), 0) | bit
+        if self.spill_file is not None:
+            lib = len(self.coll_of_cbLibXs) - 1
+            self.lib_to_num_missing_cbs[lib] = \
+                sum(cb not in self.cb_set for cb in get_smaller_cbs(head))
+            if self.lib_to_num_missing_cbs[lib] == 0:
+                self.spill_cbLibX(lib)
+
+    def spill_cbLibX(self, lib):
+        """
+        This method writes the cbLibX with index 'lib' to the spill file,
+        and removes it from memory and from the index.
+
+        Parameters
+        ----------
+        lib: int
+
+        Returns
+        -------
+        None
+
+        """
+        cbLibX = self.coll_of_cbLibXs[lib]
+        self.spill_file.write(json.dumps([lib, cbLibX]) + '\n')
+        ids, times = self.vocab.encode_cb_as_lists(cbLibX[0])
+        for event_id in set(ids):
+            self.event_to_heads[event_id] &= ~(1 << lib)
+        for pair in get_before_pairs(ids, times):
+            self.before_to_heads[pair] &= ~(1 << lib)
+        self.num_events_to_heads[len(ids)] &= ~(1 << lib)
+        self.coll_of_cbLibXs[lib] = None
+        self.head_codes[lib] = None
+        del self.lib_to_num_missing_cbs[lib]
+
+    def add_cb(self, cb):
+        """
+        This method adds 'cb' to the collection. If 'cb' has been added
+        before, it only increments 'num_republished_cbs'. Otherwise,
+        'cb' is added to every cbLibX that will admit it, and if none
+        admits it, the new cbLibX [cb] is added to the collection. If
+        spilling is on, 'cb' must be a completed Tic-Tac-Toe game.
+
+        Parameters
+        ----------
+        cb: list[str | list[str]]
+
+        Returns
+        -------
+        bool
+            True iff 'cb' had been added before
+
+        """
+        if self.spill_file is not None:
+            assert is_tic_tac_toe_cb_list([cb]) and cb_has_ended(cb), \
+                "spilling needs completed Tic-Tac-Toe games"
+        cb_key = get_cb_key(cb)
+        if cb_key in self.cb_set:
+            self.num_republished_cbs += 1
+            return True
+        self.cb_set.add(cb_key)
+        lib_indices = self.get_admitting_heads(cb)
+        for i in lib_indices:
+            self.coll_of_cbLibXs[i].append(cb)
+            if self.spill_file is not None:
+                self.lib_to_num_missing_cbs[i] -= 1
+                if self.lib_to_num_missing_cbs[i] == 0:
+                    self.spill_cbLibX(i)
+        if not lib_indices:
+            self.add_cbLibX(cb)
+        return False
+
+    def add_cbs(self, cbs):
+        """
+        This method adds, one at a time, all the cbs yielded by the iterable
+        'cbs' (a list, a generator, a file reader, etc.) to the collection.
+
+        Parameters
+        ----------
+        cbs: iterable[list[str | list[str]]]
+
+        Returns
+        -------
+        None
+
+        """
+        for cb in cbs:
+            self.add_cb(cb)
+
+    def close(self):
+        """
+        If spilling is on, this method spills all the cbLibXs that are still
+        open and closes the spill file. After this, the spill file
+        contains the whole collection.
+
+        Returns
+        -------
+        None
+
+        """
+        if self.spill_file is None:
+            return
+        for lib in sorted(self.lib_to_num_missing_cbs):
+            self.spill_cbLibX(lib)
+        self.spill_file.close()
+        self.spill_file = None
+
+
+@profiled()
+def create_indexed_coll_of_cbLibXs(num_created_cbs, policy=None):
+    """
+    This method returns the same collection of cbLibXs and the same
+    number of republished cbs as cb.create_coll_of_cbLibXs(), but it builds
+    the collection with the indexed class CbLibXColl, so it is much faster
+    for large 'num_created_cbs'.
+
+    Parameters
+    ----------
+    num_created_cbs: int
+    policy: function | None
+        move policy used to create the cbs (see cb.random_policy())
+
+    Returns
+    -------
+    list[list[list[str]], int
+
+    """
+    coll = CbLibXColl()
+    for _ in range(num_created_cbs):
+        coll.add_cb(create_cb(policy))
+    return coll.coll_of_cbLibXs, coll.num_republished_cbs
+
+
+@profiled()
+def create_streamed_coll_of_cbLibXs(cbs, spill_path=None):
+    """
+    This method builds a collection of cbLibXs from any iterable of cbs,
+    consuming it lazily. If 'spill_path' is not None, closed cbLibXs are
+    spilled to that file as soon as they are closed, so only the open
+    cbLibXs (plus a set of the distinct cbs seen) are kept in memory, and at
+    the end all the remaining cbLibXs are spilled too. The spilled
+    collection can be read back with read_spilled_cbLibXs().
+
+    Parameters
+    ----------
+    cbs: iterable[list[str]]
+    spill_path: str | None
+
+    Returns
+    -------
+    CbLibXColl
+
+    """
+    coll = CbLibXColl(spill_path)
+    coll.add_cbs(cbs)
+    coll.close()
+    return coll
+
+
+def read_spilled_cbLibXs(spill_path):
+    """
+    This method is a generator that yields, lazily and in the order in
+    which they were spilled, the pairs (lib_index, cbLibX) written to the
+    spill file 'spill_path' by CbLibXColl. 'lib_index' is the index the
+    cbLibX had in the collection.
+
+    Parameters
+    ----------
+    spill_path: str
+
+    Returns
+    -------
+    generator[(int, list[list[str]])]
+
+    """
+    with open(spill_path) as f:
+        for line in f:
+            lib, cbLibX = json.loads(line)
+            yield lib, cbLibX
+
+
+def create_shard_cbs(num_created_cbs, seed, policy=None):
+    """
+    This method is run by each worker process of
+    create_parallel_coll_of_cbLibXs(). It seeds python's 'random' module
+    with 'seed', creates 'num_created_cbs' cbs with the move policy
+    'policy' (at random if None), and inserts them into a CbLibXColl. For
+    the head of each cbLibX of this collection, it also finds all its
+    smaller cbs (see cb.get_smaller_cbs()).
+
+    Parameters
+    ----------
+    num_created_cbs: int
+    seed: int
+    policy: function | None
+
+    Returns
+    -------
+    list[(list[str], list[tuple(str)] | None)], int
+        list of the distinct cbs in the order they were first created,
+        each with its smaller cbs if it is the head of a cbLibX (and None
+        otherwise), and the number of created cbs that had already been
+        created before
+
+    """
+    random.seed(seed)
+    coll = CbLibXColl()
+    distinct_cbs = []
+    for _ in range(num_created_cbs):
+        cb = create_cb(policy)
+        if not coll.add_cb(cb):
+            distinct_cbs.append(cb)
+    heads = {tuple(cbLibX[0]) for cbLibX in coll.coll_of_cbLibXs}
+    return [(cb, get_smaller_cbs(cb) if tuple(cb) in heads else None)
+            for cb in distinct_cbs], coll.num_republished_cbs
+
+
+@profiled()
+def create_parallel_coll_of_cbLibXs(num_created_cbs, num_workers, seed=21,
+                                    policy=None):
+    """
+    This method is a sharded, multiprocess version of
+    create_indexed_coll_of_cbLibXs(). The 'num_created_cbs' cbs are split
+    into 'num_workers' shards. Shard k is created in a worker process,
+    after calling random.seed(seed + k), and inserted into its own partial
+    collection, which also finds the smaller cbs of each of its heads (see
+    create_shard_cbs()). This is where almost all the work is done.
+
+    The parent process then merges the shards, in shard order, as they
+    arrive. It keeps a dictionary mapping each smaller cb of the heads
+    merged so far to the cbLibXs of those heads, so the cbLibXs that admit
+    a distinct cb of a shard are found with one look-up. A cb that no
+    cbLibX admits is the head of a new cbLibX. It is then also a head of
+    its shard's partial collection (a cb admitted by a cbLibX of its shard
+    is also admitted by every cbLibX that admits that cbLibX's head), so
+    its smaller cbs have been found by the worker. This assumes that all
+    the cbs are completed Tic-Tac-Toe games, as they are for all the move
+    policies.
+
+    The merged collection and number of republished cbs are exactly the
+    ones that would be obtained by inserting the cbs of shard 0, then those
+    of shard 1, etc., one at a time, into a single collection. In
+    particular, the first cb of each cbLibX is still the largest one of the
+    cbLibX. The result depends on 'num_created_cbs', 'num_workers' and
+    'seed', but not on how the processes are scheduled. For num_workers=1,
+    it is the same as calling random.seed(seed) and then
+    create_coll_of_cbLibXs(num_created_cbs). For num_workers > 1, the
+    created cbs are different from the serial ones, so the collection is
+    different too (but statistically equivalent).
+
+    Parameters
+    ----------
+    num_created_cbs: int
+    num_workers: int
+    seed: int
+    policy: function | None
+        move policy used to create the cbs (see cb.random_policy()). It
+        must be picklable, e.g., a module level function or an
+        EpsilonGreedyPolicy (see policies.py).
+
+    Returns
+    -------
+    list[list[list[str]], int
+
+    """
+    from multiprocessing import Pool
+    from policies import get_minimax_table
+
+    # computed before the pool is created, so the forked workers share it
+    # (see policies.py)
+    get_minimax_table()
+    shard_sizes = [num_created_cbs // num_workers +
+                   int(k < num_created_cbs % num_workers)
+                   for k in range(num_workers)]
+    coll_of_cbLibXs = []
+    num_republished_cbs = 0
+    cb_set = set()
+    # dictionary mapping a smaller cb of a head to the indices of the
+    # cbLibXs with such a head. The cbs already merged are dropped from it.
+    smaller_cb_to_libs = {}
+    with Pool(num_workers) as pool:
+        # imap yields the shards in order, so shard k is merged while the
+        # later shards are still being created
+        shards = pool.imap(
+            star_create_shard_cbs,
+            [(shard_sizes[k], seed + k, policy) for k in range(num_workers)])
+        for shard_cbs, num_shard_republished_cbs in shards:
+            num_republished_cbs += num_shard_republished_cbs
+            for cb, smaller_cbs in shard_cbs:
+                cb_tuple = tuple(cb)
+                if cb_tuple in cb_set:
+                    num_republished_cbs += 1
+                    continue
+                cb_set.add(cb_tuple)
+                lib_indices = smaller_cb_to_libs.pop(cb_tuple, None)
+                if lib_indices:
+                    for i in lib_indices:
+                        coll_of_cbLibXs[i].append(cb)
+                    continue
+                assert smaller_cbs is not None
+                for smaller_cb in smaller_cbs:
+                    if smaller_cb not in cb_set:
+                        smaller_cb_to_libs.setdefault(smaller_cb, []).append(
+                            len(coll_of_cbLibXs))
+                coll_of_cbLibXs.append([cb])
+    return coll_of_cbLibXs, num_republished_cbs
+
+
+def star_create_shard_cbs(args):
+    """
+    This method calls create_shard_cbs(*args). It is needed because
+    Pool.imap() passes a single argument.
+
+    Parameters
+    ----------
+    args: (int, int, function | None)
+
+    Returns
+    -------
+    list[(list[str], list[tuple(str)] | None)], int
+
+    """
+    return create_shard_cbs(*args)
@@ -0,0 +1,86 @@
+class DAG:
+    """
+    This class stores a directed graph, given as a list of arrows, with
+    adjacency dictionaries built in one pass over the arrows. It also
+    computes a topological order of the nodes, which exists iff the graph
+    has no cycles, i.e., iff it really is a DAG. This class is used by
+    BayesNet, and by threshold_sweep.py to skip the cyclic high frequency
+    arrows DAGs.
+
+    Attributes
+    ----------
+    arrows: list[(str,str)]
+        This is a list of the arrows of the graph. An arrow in a pair of
+        node names.
+    nodes: list[str]
+        list of all node names of the graph, in the order in which they
+        first appear in 'arrows'
+    nd_to_parents: dict[str, list[str]]
+        dictionary mapping node to list of parents, in the order in which
+        they first appear in 'arrows'
+    nd_to_children: dict[str, list[str]]
+        dictionary mapping node to list of children, in the order in which
+        they first appear in 'arrows'
+    topological_order: list[str] | None
+        list of all the nodes such that every node comes after all its
+        parents, or None if the graph has a cycle
+
+    """
+
+    def __init__(self, arrows):
+        """
+
+        Parameters
+        ----------
+        arrows: list[(str,str)]
+        """
+        self.arrows = arrows
+        self.nodes = []
+        self.nd_to_parents = {}
+        self.nd_to_children = {}
+        arrow_set = set()
+        for arrow in arrows:
+            for nd in arrow:
+                if nd not in self.nd_to_parents:
+                    self.nodes.append(nd)
+                    self.nd_to_parents[nd] = []
+                    self.nd_to_children[nd] = []
+            if tuple(arrow) not in arrow_set:
+                arrow_set.add(tuple(arrow))
+                self.nd_to_parents[arrow[1]].append(arrow[0])
+                self.nd_to_children[arrow[0]].append(arrow[1])
+        self.topological_order = self.get_topological_order()
+
+    def get_topological_order(self):
+        """
+        This method returns a topological order of the nodes (Kahn's
+        algorithm), or None if the graph has a cycle.
+
+        Returns
+        -------
+        list[str] | None
+
+        """
+        nd_to_num_pending_parents = {nd: len(self.nd_to_parents[nd])
+                                     for nd in self.nodes}
+        order = [nd for nd in self.nodes
+                 if nd_to_num_pending_parents[nd] == 0]
+        for nd in order:
+            for child in self.nd_to_children[nd]:
+                nd_to_num_pending_parents[child] -= 1
+                if nd_to_num_pending_parents[child] == 0:
+                    order.append(child)
+        if len(order) < len(self.nodes):
+            return None
+        return order
+
+    def has_cycle(self):
+        """
+        Returns True iff the graph has a cycle (so it isn't a DAG)
+
+        Returns
+        -------
+        bool
+
+        """
+        return self.topological_order is None
@@ -0,0 +1,266 @@
+import numpy as np
+from events import *
+from event_vocab import *
+from dot import *
+from profiling import *
+
+"""These are methods for counting the arrows of the DAGs that
+dot.dot_for_cb() builds for many cbs at once, without building any dot
+strings. Each of the 18 possible events (frames) 'X0', ..., 'X8', 'O0',
+..., 'O8' is given an integer code (see events.EVENTS), so an arrow
+e1->e2 is a pair of codes (src, dst), and the arrow frequencies of a list
+of cbs are stored in an 18x18 count matrix whose entry [src, dst] is the
+number of times the arrow src->dst occurs. """
+
+
+def count_arrows(cb_list, memory_time):
+    """
+    This method returns the 18x18 count matrix of the arrows of the DAGs
+    that dot.dot_for_cb() builds, with memory time 'memory_time', for all
+    the cbs in 'cb_list'. All the arrows of all the cbs are counted with a
+    single np.bincount() pass per time delay (see count_arrows_for_coll()).
+
+    Parameters
+    ----------
+    cb_list: list[list[str]]
+    memory_time: int
+
+    Returns
+    -------
+    np.array[int64]
+
+    """
+    return count_arrows_for_coll([cb_list], memory_time)[0]
+
+
+def count_matrix_to_arrow_freq_dict(counts):
+    """
+    This method converts an 18x18 count matrix into the arrow frequency
+    dictionary used by dot.dot_for_high_freq_arrows_DAG(). Only arrows
+    that occur at least once are included.
+
+    Parameters
+    ----------
+    counts: np.array[int64]
+
+    Returns
+    -------
+    dict[(str,str), int]
+
+    """
+    src_codes, dst_codes = np.nonzero(counts)
+    return {(EVENTS[src], EVENTS[dst]): int(counts[src, dst])
+            for src, dst in zip(src_codes.tolist(), dst_codes.tolist())}
+
+
+@profiled()
+def get_arrow_freq_dict(cb_list, memory_time):
+    """
+    This method returns the arrow frequency dictionary (see
+    dot.dot_for_high_freq_arrows_DAG()) of all the cbs in 'cb_list', with
+    memory time 'memory_time'. Tic-Tac-Toe cbs are counted with
+    count_arrows(), and any other cbs (e.g., with multi-event frames) with
+    event_vocab.get_vocab_arrow_freq_dict().
+
+    Parameters
+    ----------
+    cb_list: list[list[str | list[str]]]
+    memory_time: int
+
+    Returns
+    -------
+    dict[(str,str), int]
+
+    """
+    if is_tic_tac_toe_cb_list(cb_list):
+        return count_matrix_to_arrow_freq_dict(
+            count_arrows(cb_list, memory_time))
+    return get_vocab_arrow_freq_dict(cb_list, memory_time)
+
+
+def count_arrows_for_coll(coll_of_cbLibXs, memory_time):
+    """
+    This method returns the stacked count matrices of all the cbLibXs in
+    'coll_of_cbLibXs', as an array of shape (num_libs, 18, 18) whose
+    [lib] entry is count_arrows(coll_of_cbLibXs[lib], memory_time). The
+    cbs of all the cbLibXs are counted together, with a single
+    np.bincount() pass per time delay.
+
+    Parameters
+    ----------
+    coll_of_cbLibXs: list[list[list[str]]]
+    memory_time: int
+
+    Returns
+    -------
+    np.array[int64]
+
+    """
+    num_libs = len(coll_of_cbLibXs)
+    size = NUM_EVENTS * NUM_EVENTS
+    all_cbs = [cb for cbLibX in coll_of_cbLibXs for cb in cbLibX]
+    libs = np.repeat(np.arange(num_libs),
+                     [len(cbLibX) for cbLibX in coll_of_cbLibXs])
+    codes = moves_to_event_codes(cbs_to_cb_batch(all_cbs)[0])
+    counts = np.zeros((num_libs * size,), dtype=np.int64)
+    for delta in range(1, min(memory_time, codes.shape[1] - 1) + 1):
+        src = codes[:, :-delta]
+        dst = codes[:, delta:]
+        is_arrow = (src >= 0) & (dst >= 0)
+        row_libs = np.broadcast_to(libs[:, np.newaxis], src.shape)
+        counts += np.bincount(row_libs[is_arrow] * size +
+                              src[is_arrow] * NUM_EVENTS + dst[is_arrow],
+                              minlength=num_libs * size)
+    return counts.reshape((num_libs, NUM_EVENTS, NUM_EVENTS))
+
+
+def get_high_freq_arrows_batch(count_tensor, arr_rep_th):
+    """
+    This method applies the arrow repetition threshold 'arr_rep_th' to all
+    the count matrices in 'count_tensor' at once. For each cbLibX, it
+    returns the same arrows as dot.dot_for_high_freq_arrows_DAG(), i.e.,
+    those that occur at least once and at least 'arr_rep_th' times, but
+    ordered by (src, dst) code.
+
+    Parameters
+    ----------
+    count_tensor: np.array[int64]
+        array of shape (num_libs, 18, 18), as returned by
+        count_arrows_for_coll()
+    arr_rep_th: int
+
+    Returns
+    -------
+    list[list[(str, str)]]
+
+    """
+    is_hfa = (count_tensor >= arr_rep_th) & (count_tensor > 0)
+    libs, src_codes, dst_codes = np.nonzero(is_hfa)
+    ends = np.cumsum(np.bincount(libs, minlength=len(count_tensor)))
+    arrows = [(EVENTS[src], EVENTS[dst])
+              for src, dst in zip(src_codes.tolist(), dst_codes.tolist())]
+    starts = np.concatenate(([0], ends[:-1]))
+    return [arrows[start:end]
+            for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+def gen_high_freq_arrows_dots(count_tensor, arr_rep_th):
+    """
+    This method is a generator that yields, lazily, for each count matrix
+    in 'count_tensor', the dot string of the high frequency arrows DAG
+    with arrow repetition threshold 'arr_rep_th' (see
+    dot.dot_for_high_freq_arrows_DAG()).
+
+    Parameters
+    ----------
+    count_tensor: np.array[int64]
+    arr_rep_th: int
+
+    Returns
+    -------
+    generator[str]
+
+    """
+    for counts in count_tensor:
+        dot, _ = dot_for_high_freq_arrows_DAG(
+            count_matrix_to_arrow_freq_dict(counts), arr_rep_th)
+        yield dot
+
+
+class ArrowCounter:
+    """
+    This class keeps the arrow count matrix of a cbLibX up to date as cbs
+    are added to it (or removed from it), so that the counts never have to
+    be recomputed from scratch. The arrow frequency dictionary and the dot
+    string of the high frequency arrows DAG are only built when asked for.
+
+    Attributes
+    ----------
+    memory_time: int
+    counts: np.array[int64]
+        18x18 count matrix of the arrows of all the cbs added so far
+    num_cbs: int
+        number of cbs added so far
+
+    """
+
+    def __init__(self, memory_time, cb_list=None):
+        """
+
+        Parameters
+        ----------
+        memory_time: int
+        cb_list: list[list[str]] | None
+            cbs to add initially, for example a cbLibX
+        """
+        self.memory_time = memory_time
+        self.counts = np.zeros((NUM_EVENTS, NUM_EVENTS), dtype=np.int64)
+        self.num_cbs = 0
+        if cb_list:
+            self.add_cbs(cb_list)
+
+    def add_cbs(self, cb_list):
+        """
+        This method adds the arrows of all the cbs in 'cb_list' to the
+        counts.
+
+        Parameters
+        ----------
+        cb_list: list[list[str]]
+
+        Returns
+        -------
+        None
+
+        """
+        self.counts += count_arrows(cb_list, self.memory_time)
+        self.num_cbs += len(cb_list)
+
+    def remove_cbs(self, cb_list):
+        """
+        This method removes the arrows of all the cbs in 'cb_list',
+        which must have been added before, from the counts.
+
+        Parameters
+        ----------
+        cb_list: list[list[str]]
+
+        Returns
+        -------
+        None
+
+        """
+        self.counts -= count_arrows(cb_list, self.memory_time)
+        self.num_cbs -= len(cb_list)
+        assert (self.counts >= 0).all()
+
+    def get_arrow_freq_dict(self):
+        """
+        This method returns the arrow frequency dictionary of the cbs added
+        so far.
+
+        Returns
+        -------
+        dict[(str,str), int]
+
+        """
+        return count_matrix_to_arrow_freq_dict(self.counts)
+
+    def get_dot(self, arr_rep_th=1):
+        """
+        This method returns the dot string and the arrows of the high
+        frequency arrows DAG (see dot.dot_for_high_freq_arrows_DAG()) of the
+        cbs added so far. With the default arr_rep_th=1, this is the DAG
+        of all the arrows that occur at least once.
+
+        Parameters
+        ----------
+        arr_rep_th: int
+
+        Returns
+        -------
+        str, list[(str, str)]
+
+        """
+        return dot_for_high_freq_arrows_DAG(self.get_arrow_freq_dict(),
+                                            arr_rep_th)
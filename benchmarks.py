@@ -0,0 +1,364 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+from cb import *
+from cb_batch import *
+from CbLibXColl import *
+from cb_enumeration import *
+from dot import *
+from arrow_counts import *
+from dataset import *
+from BayesNet import *
+from policies import *
+
+__doc__ = """This is a benchmark harness for the hot paths of this repo. Each
+benchmark is run for several sizes (numbers of games), and the results are
+written to a JSON report, so that different releases can be compared.
+For each benchmark, the report also gives the exponent k of the best fit
+time ~ size^k over all the sizes, which exposes the quadratic paths (k close
+to 2).
+
+Usage (from a terminal):
+
+    python benchmarks.py --sizes 1000 10000 100000 1000000 --out bench.json
+
+A benchmark is a function that takes a size and returns a function with
+no arguments that does the work to be timed. Everything that is not part
+of the work (e.g., creating the input cbs) is done before returning,
+so it is not timed.
+
+The report also gives the import time of each module of the computational
+core, each measured in a fresh python process, and which of the heavy
+rendering packages that import loaded (it should be none of them). """
+
+# The quadratic benchmarks are only run up to this size, since the
+# larger sizes would take hours.
+MAX_QUADRATIC_SIZE = 10**4
+
+
+def create_random_cbs(size):
+    """
+    This method returns 'size' random cbs, always the same ones.
+
+    Parameters
+    ----------
+    size: int
+
+    Returns
+    -------
+    list[list[str]]
+
+    """
+    return cb_batch_to_cbs(*create_cb_batch(size, seed=0))
+
+
+def create_random_cbLibX(size):
+    """
+    This method returns a cbLibX-like list of 'size' + 1 cbs whose first
+    cb is a draw (so it contains all 9 positions) followed by 'size'
+    random cbs, always the same ones.
+
+    Parameters
+    ----------
+    size: int
+
+    Returns
+    -------
+    list[list[str]]
+
+    """
+    head = ['X0', 'O4', 'X8', 'O1', 'X7', 'O6', 'X2', 'O5', 'X3']
+    assert cb_has_ended(head) and len(head) == 9
+    return [head] + create_random_cbs(size)
+
+
+def bench_create_cb(size):
+    return lambda: [create_cb() for _ in range(size)]
+
+
+def bench_create_cb_minimax(size):
+    get_minimax_table()
+    return lambda: [create_cb(minimax_policy) for _ in range(size)]
+
+
+def bench_create_cb_batch(size):
+    return lambda: create_cb_batch(size, seed=0)
+
+
+def bench_cb_has_ended(size):
+    cbs = create_random_cbs(size)
+    return lambda: [cb_has_ended(cb) for cb in cbs]
+
+
+def bench_create_coll_of_cbLibXs(size):
+    return lambda: create_coll_of_cbLibXs(size)
+
+
+def bench_create_indexed_coll_of_cbLibXs(size):
+    return lambda: create_indexed_coll_of_cbLibXs(size)
+
+
+def bench_create_exhaustive_coll_of_cbLibXs(size):
+    return lambda: create_exhaustive_coll_of_cbLibXs(size)
+
+
+def bench_dot_for_cb(size):
+    cbs = create_random_cbs(size)
+    return lambda: [dot_for_cb(cb, 2) for cb in cbs]
+
+
+def bench_count_arrows(size):
+    cbs = create_random_cbs(size)
+    return lambda: count_arrows(cbs, 2)
+
+
+def bench_get_dataset_matrix(size):
+    cbLibX = create_random_cbLibX(size)
+    return lambda: get_dataset_matrix(cbLibX)
+
+
+def bench_BayesNet(size):
+    cbLibX = create_random_cbLibX(size)
+    packed_dataset, columns = get_packed_dataset(cbLibX)
+    _, arrows = dot_for_cb(cbLibX[0], 2)
+    return lambda: BayesNet(arrows,
+                            packed_dataset=packed_dataset,
+                            columns=columns)
+
+
+# modules whose import time is measured
+CORE_MODULES = ['cb', 'events', 'cb_batch', 'CbLibXColl', 'cb_enumeration',
+                'cb_storage', 'DAG', 'dot', 'latex_rendering',
+                'render_cache', 'grid_rendering',
+                'arrow_counts', 'dataset', 'BayesNet', 'BayesNetInference',
+                'threshold_sweep', 'frames', 'event_vocab', 'policies',
+                'profiling']
+
+# packages only needed for drawing, which the core must not import
+RENDERING_PACKAGES = ['graphviz', 'IPython', 'PIL', 'matplotlib', 'pandas']
+
+
+# dictionary mapping benchmark name to (benchmark, is_quadratic, max_size).
+# The benchmark is skipped for sizes larger than max_size, if not None.
+# There are only NUM_GAMES games, so the exhaustive collection can't be
+# larger.
+NAME_TO_BENCH = {
+    'create_cb': (bench_create_cb, False, None),
+    'create_cb_minimax': (bench_create_cb_minimax, False, None),
+    'create_cb_batch': (bench_create_cb_batch, False, None),
+    'cb_has_ended': (bench_cb_has_ended, False, None),
+    'create_coll_of_cbLibXs': (bench_create_coll_of_cbLibXs, True, None),
+    'create_indexed_coll_of_cbLibXs':
+        (bench_create_indexed_coll_of_cbLibXs, False, None),
+    'create_exhaustive_coll_of_cbLibXs':
+        (bench_create_exhaustive_coll_of_cbLibXs, False, NUM_GAMES),
+    'dot_for_cb': (bench_dot_for_cb, False, None),
+    'count_arrows': (bench_count_arrows, False, None),
+    'get_dataset_matrix': (bench_get_dataset_matrix, False, None),
+    'BayesNet': (bench_BayesNet, False, None),
+}
+
+
+def time_work(work, repeat):
+    """
+    This method calls 'work' 'repeat' times and returns the times it took.
+
+    Parameters
+    ----------
+    work: function
+    repeat: int
+
+    Returns
+    -------
+    list[float]
+
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        work()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def get_scaling_exponent(sizes, times):
+    """
+    This method returns the exponent k of the least squares fit of
+    log(time) = k*log(size) + c, or None if there are less than 2 sizes.
+
+    Parameters
+    ----------
+    sizes: list[int]
+    times: list[float]
+
+    Returns
+    -------
+    float | None
+
+    """
+    if len(sizes) < 2:
+        return None
+    return float(np.polyfit(np.log(sizes), np.log(times), 1)[0])
+
+
+def time_import(module):
+    """
+    This method imports 'module' in a fresh python process and returns how
+    long the import took, and which of the RENDERING_PACKAGES it loaded.
+
+    Parameters
+    ----------
+    module: str
+
+    Returns
+    -------
+    float, list[str]
+
+    """
+    code = "import sys, time, json\n" \
+           "start = time.perf_counter()\n" \
+           "import " + module + "\n" \
+           "seconds = time.perf_counter() - start\n" \
+           "loaded = [p for p in " + repr(RENDERING_PACKAGES) + \
+           " if p in sys.modules]\n" \
+           "print(json.dumps([seconds, loaded]))\n"
+    out = subprocess.run([sys.executable, '-c', code],
+                         capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    seconds, loaded = json.loads(out.stdout)
+    return seconds, loaded
+
+
+def time_imports(modules=None, verbose=True):
+    """
+    This method returns the import time of each module in 'modules'
+    (CORE_MODULES if None), see time_import().
+
+    Parameters
+    ----------
+    modules: list[str] | None
+    verbose: bool
+
+    Returns
+    -------
+    dict[str, dict]
+        dictionary mapping module to {'seconds': float, 'loaded': list[str]}
+
+    """
+    if modules is None:
+        modules = CORE_MODULES
+    module_to_import = {}
+    for module in modules:
+        seconds, loaded = time_import(module)
+        module_to_import[module] = {'seconds': seconds, 'loaded': loaded}
+        if verbose:
+            print(module, module_to_import[module])
+    return module_to_import
+
+
+def run_benchmarks(sizes, names=None, repeat=3,
+                   max_quadratic_size=MAX_QUADRATIC_SIZE, verbose=True):
+    """
+    This method runs the benchmarks with names 'names' (all of them if
+    None) for all the sizes in 'sizes', and returns the report.
+
+    Parameters
+    ----------
+    sizes: list[int]
+    names: list[str] | None
+    repeat: int
+        number of times each benchmark is timed for each size. The report
+        gives the best and the median time.
+    max_quadratic_size: int
+        quadratic benchmarks are skipped for sizes larger than this
+    verbose: bool
+
+    Returns
+    -------
+    dict
+        report with keys 'metadata', 'imports', 'results' and 'scaling'
+
+    """
+    if names is None:
+        names = list(NAME_TO_BENCH)
+    imports = time_imports(verbose=verbose)
+    results = []
+    scaling = {}
+    for name in names:
+        bench, is_quadratic, max_size = NAME_TO_BENCH[name]
+        bench_sizes = []
+        best_times = []
+        for size in sizes:
+            if is_quadratic and size > max_quadratic_size:
+                continue
+            if max_size is not None and size > max_size:
+                continue
+            times = time_work(bench(size), repeat)
+            result = {'benchmark': name,
+                      'size': size,
+                      'repeat': repeat,
+                      'best_s': min(times),
+                      'median_s': float(np.median(times)),
+                      'best_us_per_item': 1e6 * min(times) / size}
+            if verbose:
+                print(result)
+            results.append(result)
+            bench_sizes.append(size)
+            best_times.append(min(times))
+        scaling[name] = get_scaling_exponent(bench_sizes, best_times)
+    metadata = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'sizes': list(sizes),
+    }
+    return {'metadata': metadata,
+            'imports': imports,
+            'results': results,
+            'scaling': scaling}
+
+
+def write_report(report, path):
+    """
+    This method writes the report 'report' to the JSON file 'path'.
+
+    Parameters
+    ----------
+    report: dict
+    path: str
+
+    Returns
+    -------
+    None
+
+    """
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10**3, 10**4, 10**5, 10**6])
+    parser.add_argument('--only', nargs='+', choices=list(NAME_TO_BENCH),
+                        default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-quadratic-size', type=int,
+                        default=MAX_QUADRATIC_SIZE)
+    parser.add_argument('--out', default='bench.json')
+    args = parser.parse_args()
+    write_report(run_benchmarks(args.sizes,
+                                args.only,
+                                args.repeat,
+                                args.max_quadratic_size),
+                 args.out)
@@ -1,4 +1,7 @@
 import random
+from functools import lru_cache
+from frames import *
+from profiling import *
 random.seed(21)
 
 """These are methods for CBs (comic books). A cb is a list of 
@@ -13,6 +16,102 @@ In the general case considered in the arXiv paper, a frame, instead of being
 a single string, can be a list of strings called event descriptors, 
 which represent simultaneous events in the frame. """
 
+# A cb/game can also be stored compactly as a "bitboard": a 9-bit mask of
+# the positions occupied by X, a 9-bit mask of the positions occupied by
+# O, and the list of positions in the order they were played. Bit i of a
+# mask refers to position i of the grid.
+
+WINNING_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100)  # diagonals
+
+# MASK_HAS_WIN[mask] is True iff 'mask' contains a winning pattern
+MASK_HAS_WIN = tuple(any(mask & w == w for w in WINNING_MASKS)
+                     for mask in range(512))
+
+# EMPTY_SPACES[mask] is list(set(range(9)) - occupied_spaces) for the
+# occupied spaces in 'mask'. This list is not always in increasing order.
+# Keeping the exact same order as the set difference originally used by
+# next_frame() makes seeded runs produce the same cbs as before.
+EMPTY_SPACES = tuple(
+    list(set(range(9)) - {pos for pos in range(9) if mask >> pos & 1})
+    for mask in range(512))
+
+
+def cb_to_bitboard(cb):
+    """
+    Returns the bitboard (x_mask, o_mask, moves) of cb/game 'cb'.
+
+    Parameters
+    ----------
+    cb: list[str]
+
+    Returns
+    -------
+    int, int, list[int]
+
+    """
+    x_mask = 0
+    o_mask = 0
+    moves = []
+    for frame in cb:
+        pos = int(frame[1])
+        if frame[0] == 'X':
+            x_mask |= 1 << pos
+        elif frame[0] == 'O':
+            o_mask |= 1 << pos
+        else:
+            assert False
+        moves.append(pos)
+    return x_mask, o_mask, moves
+
+
+def bitboard_to_cb(x_mask, o_mask, moves):
+    """
+    Returns the cb/game with bitboard (x_mask, o_mask, moves). This is the
+    inverse of cb_to_bitboard().
+
+    Parameters
+    ----------
+    x_mask: int
+    o_mask: int
+    moves: list[int]
+
+    Returns
+    -------
+    list[str]
+
+    """
+    cb = []
+    for pos in moves:
+        if x_mask >> pos & 1:
+            cb.append('X' + str(pos))
+        else:
+            assert o_mask >> pos & 1
+            cb.append('O' + str(pos))
+    return cb
+
+
+def bitboard_has_ended(x_mask, o_mask):
+    """
+    Returns True if the cb/game with X positions 'x_mask' and O positions
+    'o_mask' has ended
+
+    Parameters
+    ----------
+    x_mask: int
+    o_mask: int
+
+    Returns
+    -------
+    bool
+
+    """
+    return x_mask | o_mask == 0b111111111 or \
+        MASK_HAS_WIN[x_mask] or MASK_HAS_WIN[o_mask]
+
+
 def cb_has_ended(cb):
     """
     Returns True if cb/game has ended
@@ -28,39 +127,46 @@ def cb_has_ended(cb):
     """
     if len(cb) == 9:
         return True
-    winning_patterns = [
-        ['X0', 'X1', 'X2'],
-        ['X3', 'X4', 'X5'],
-        ['X6', 'X7', 'X8'],
-        ['X0', 'X3', 'X6'],
-        ['X1', 'X4', 'X7'],
-        ['X2', 'X5', 'X8'],
-        ['X0', 'X4', 'X8'],
-        ['X2', 'X4', 'X6'],
-        ['O0', 'O1', 'O2'],
-        ['O3', 'O4', 'O5'],
-        ['O6', 'O7', 'O8'],
-        ['O0', 'O3', 'O6'],
-        ['O1', 'O4', 'O7'],
-        ['O2', 'O5', 'O8'],
-        ['O0', 'O4', 'O8'],
-        ['O2', 'O4', 'O6']]
-
-    for pattern in winning_patterns:
-        if set(pattern).issubset(set(cb)):
-            return True
-    return False
+    x_mask, o_mask, _ = cb_to_bitboard(cb)
+    return MASK_HAS_WIN[x_mask] or MASK_HAS_WIN[o_mask]
+
+
+def random_policy(x_mask, o_mask, player):
+    """
+    This is the default move policy. It returns a position chosen at
+    random, with python's 'random' module, from the empty positions.
+
+    A move policy is any function (or callable object) with the same
+    parameters and return value as this one, which is called only for
+    games that have not ended. See policies.py for other move policies.
+
+    Parameters
+    ----------
+    x_mask: int
+    o_mask: int
+    player: int
+        0 if X is to play, 1 if O is to play
+
+    Returns
+    -------
+    int
+
+    """
+    return random.choice(EMPTY_SPACES[x_mask | o_mask])
 
 
-def next_frame(incomplete_cb):
+def next_frame(incomplete_cb, policy=None):
     """
     Returns next frame/move for the incomplete cb 'incomplete_cb'. This next
-    frame is chosen at random from the remaining possible moves, assuming
-    'incomplete_cb' is not an ended game.
+    frame is chosen by the move policy 'policy' (at random from the
+    remaining possible moves if None), assuming 'incomplete_cb' is not an
+    ended game.
 
     Parameters
     ----------
     incomplete_cb: list[str]
+    policy: function | None
+        see random_policy()
 
     Returns
     -------
@@ -68,8 +174,9 @@ def next_frame(incomplete_cb):
 
     """
     assert 0 < len(incomplete_cb) < 9
-    occupied_spaces = set([int(x[1]) for x in incomplete_cb])
-    empty_spaces = set(range(9)) - occupied_spaces
+    if policy is None:
+        policy = random_policy
+    x_mask, o_mask, _ = cb_to_bitboard(incomplete_cb)
     last_player = incomplete_cb[-1][0]
     if last_player == 'O':
         next_player = 'X'
@@ -77,25 +184,78 @@ def next_frame(incomplete_cb):
         next_player = 'O'
     else:
         assert False
-    next_space = random.choice(list(empty_spaces))
+    next_space = policy(x_mask, o_mask, int(next_player == 'O'))
     return next_player + str(next_space)
 
 
-def create_cb():
+def create_bitboard(policy=None):
+    """
+    Returns the bitboard (x_mask, o_mask, moves) of a cb/game that is
+    completed (i.e., either one player has won or there was a draw.) Both
+    players choose their moves with the move policy 'policy' (at random if
+    None).
+
+    Parameters
+    ----------
+    policy: function | None
+        see random_policy()
+
+    Returns
+    -------
+    int, int, list[int]
+
+    """
+    if policy is None:
+        policy = random_policy
+    masks = [0, 0]
+    moves = []
+    player = 1
+    while not bitboard_has_ended(masks[0], masks[1]):
+        player = 1 - player  # X always first
+        pos = policy(masks[0], masks[1], player)
+        masks[player] |= 1 << pos
+        moves.append(pos)
+    return masks[0], masks[1], moves
+
+
+def create_cb(policy=None):
     """
-    Returns a cb/game, chosen at random, that is completed (i.e., either one
-    player has won or there was a draw.)
+    Returns a cb/game that is completed (i.e., either one player has won or
+    there was a draw.) Both players choose their moves with the move policy
+    'policy' (at random if None).
+
+    Parameters
+    ----------
+    policy: function | None
+        see random_policy()
 
     Returns
     -------
     list[str]
 
     """
-    i = random.randrange(9)
-    cb = ['X' + str(i)]   # X always first
-    while not cb_has_ended(cb):
-        cb.append(next_frame(cb))
-    return cb
+    return bitboard_to_cb(*create_bitboard(policy))
+
+
+@lru_cache(maxsize=1 << 16)
+def get_event_to_time(cb_tuple):
+    """
+    Returns a dictionary mapping each event of the cb 'cb_tuple' (given as
+    a tuple, so that it can be hashed) to the time at which it occurs.
+    The results are memoized with an LRU cache, so the encoding of a cb
+    that is compared many times, like the first cb of a cbLibX, is only
+    built once. The returned dictionary must not be modified.
+
+    Parameters
+    ----------
+    cb_tuple: tuple(str)
+
+    Returns
+    -------
+    dict[str, int]
+
+    """
+    return {event: time for time, event in enumerate(cb_tuple)}
 
 
 def cb1_is_smaller_that_cb2(cb1, cb2):
@@ -103,22 +263,82 @@ def cb1_is_smaller_that_cb2(cb1, cb2):
     Returns True iff cb1 is smaller than cb2 (cb1 < cb2). As defined in the
     arXiv paper, cb1 < cb2 means cb1 is a proper subset of cb2 and the
     events in cb1 are in the same chronological order as the corresponding
-    events in cb2.
+    events in cb2. If some frame has several events, the events are
+    compared as in frames.events_are_smaller(), or as in
+    frames.frames_are_smaller() if cb2 has repeated events.
 
     Parameters
     ----------
-    cb1: list[str]
-    cb2: list[str]
+    cb1: list[str | list[str]]
+    cb2: list[str | list[str]]
 
     Returns
     -------
     bool
 
     """
-    if set(cb1) == set(cb2) or set(cb1).issuperset(cb2):
+    if not (is_single_event_cb(cb1) and is_single_event_cb(cb2)):
+        events1, times1 = get_cb_events(cb1)
+        events2, times2 = get_cb_events(cb2)
+        event_to_time2 = get_event_to_time_of_events(events2, times2)
+        if event_to_time2 is None:  # cb2 has repeated events
+            return frames_are_smaller(cb1, cb2)
+        return events_are_smaller(events1, times1, event_to_time2,
+                                  len(events2))
+    event_to_time = get_event_to_time(tuple(cb2))
+    if len(event_to_time) < len(cb2):  # cb2 has repeated events
+        if set(cb1) == set(cb2) or set(cb1).issuperset(cb2):
+            return False
+        cb2_ = [x for x in cb2 if x in cb1]
+        return cb1 == cb2_
+    # cb1 < cb2 iff cb1 is shorter than cb2 and the times in cb2 of the
+    # events of cb1 are all defined and strictly increasing
+    if len(cb1) >= len(cb2):
         return False
-    cb2_ = [x for x in cb2 if x in cb1]
-    return cb1 == cb2_
+    last_time = -1
+    for event in cb1:
+        time = event_to_time.get(event, -1)
+        if time <= last_time:
+            return False
+        last_time = time
+    return True
+
+
+def get_smaller_cbs(cb):
+    """
+    Returns all the completed cbs/games that are smaller than 'cb' (see
+    cb1_is_smaller_that_cb2()). These are the only new cbs that a cbLibX
+    whose first cb is 'cb' can ever admit.
+
+    Parameters
+    ----------
+    cb: list[str]
+
+    Returns
+    -------
+    list[tuple(str)]
+
+    """
+    x_mask, _, moves = cb_to_bitboard(cb)
+    is_x_move = [bool(x_mask >> pos & 1) for pos in moves]
+    smaller_cbs = []
+
+    def extend(start, masks, sub_cb):
+        player = len(sub_cb) % 2
+        for j in range(start, len(cb)):
+            if is_x_move[j] != (player == 0):
+                continue
+            new_masks = list(masks)
+            new_masks[player] |= 1 << moves[j]
+            new_sub_cb = sub_cb + (cb[j],)
+            if bitboard_has_ended(*new_masks):
+                if len(new_sub_cb) < len(cb):
+                    smaller_cbs.append(new_sub_cb)
+            else:
+                extend(j + 1, new_masks, new_sub_cb)
+
+    extend(0, [0, 0], ())
+    return smaller_cbs
 
 
 def cb_already_in_cbLib(cb, cbLib):
@@ -142,7 +362,8 @@ def cb_already_in_cbLib(cb, cbLib):
     return False
 
 
-def create_coll_of_cbLibXs(num_created_cbs):
+@profiled()
+def create_coll_of_cbLibXs(num_created_cbs, policy=None):
     """
     As defined in the ArXiv paper, 'cbLibX' is a "time compatible library of
     cbs". It's a library of cbs such that the first cb is the largest one of
@@ -158,6 +379,8 @@ def create_coll_of_cbLibXs(num_created_cbs):
     Parameters
     ----------
     num_created_cbs: int
+    policy: function | None
+        move policy used to create the cbs (see random_policy())
 
     Returns
     -------
@@ -167,7 +390,7 @@ def create_coll_of_cbLibXs(num_created_cbs):
     coll_of_cbLibXs = []
     num_republished_cbs = 0
     for _ in range(num_created_cbs):
-        new_cb = create_cb()
+        new_cb = create_cb(policy)
         new_cb_has_found_home = False
         if len(coll_of_cbLibXs) == 0:
             coll_of_cbLibXs.append([new_cb])
@@ -0,0 +1,131 @@
+import numpy as np
+from functools import lru_cache
+from cb import *
+from events import *
+from profiling import *
+
+"""These are methods for creating large batches of cbs/games at once with
+numpy. A batch of N cbs is stored compactly as a pair (moves, lengths).
+'moves' is an np.array of shape (N, 9) and dtype int8 whose row i gives the
+positions played in cb i, in chronological order, padded with -1 after the
+last move. 'lengths' is an np.array of shape (N,) giving the number of moves
+of each cb. As always, X plays first, so the moves in even columns are X's
+and those in odd columns are O's. """
+
+# np.array version of cb.MASK_HAS_WIN, for vectorized look-ups
+MASK_HAS_WIN_ARRAY = np.array(MASK_HAS_WIN, dtype=bool)
+
+
+@profiled()
+def create_cb_batch(num_cbs, seed=None):
+    """
+    This method returns a batch of 'num_cbs' completed cbs/games, chosen at
+    random. All the cbs are simulated at the same time: each row starts as
+    a random permutation of the 9 positions, and, at each time (ply),
+    the games that have just been won are detected with a vectorized
+    look-up of MASK_HAS_WIN_ARRAY. Each row is then truncated after its
+    ending move. The cbs have the same distribution as the ones produced
+    by cb.create_cb(), but they are not the same cbs since they are drawn
+    from a numpy random generator instead of python's 'random' module.
+
+    Parameters
+    ----------
+    num_cbs: int
+    seed: int | None
+        seed of the numpy random generator. The same seed always returns
+        the same batch.
+
+    Returns
+    -------
+    np.array[int8], np.array[int8]
+        moves of shape (num_cbs, 9), lengths of shape (num_cbs,)
+
+    """
+    rng = np.random.default_rng(seed)
+    moves = rng.permuted(
+        np.tile(np.arange(9, dtype=np.int8), (num_cbs, 1)), axis=1)
+    masks = np.zeros((2, num_cbs), dtype=np.int16)  # X masks, O masks
+    lengths = np.full((num_cbs,), 9, dtype=np.int8)
+    has_ended = np.zeros((num_cbs,), dtype=bool)
+    for time in range(9):
+        player = time % 2
+        masks[player] |= 1 << moves[:, time].astype(np.int16)
+        if time < 4:  # no one can win before the 5th move
+            continue
+        has_won = MASK_HAS_WIN_ARRAY[masks[player]]
+        lengths[has_won & ~has_ended] = time + 1
+        has_ended |= has_won
+    moves[np.arange(9) >= lengths[:, np.newaxis]] = -1
+    return moves, lengths
+
+
+@lru_cache(maxsize=1 << 16)
+def get_event_times(cb_tuple):
+    """
+    This method returns the encoding of the cb 'cb_tuple' (given as a
+    tuple, so that it can be hashed) as an 18-slot array whose entry for
+    the event with code 'code' is the time at which that event occurs in
+    the cb, or -1 if it doesn't occur. The results are memoized with an
+    LRU cache, and the returned array is read-only.
+
+    Parameters
+    ----------
+    cb_tuple: tuple(str)
+
+    Returns
+    -------
+    np.array[int8]
+
+    """
+    times = np.full((NUM_EVENTS,), -1, dtype=np.int8)
+    times[[EVENT_TO_CODE[event] for event in cb_tuple]] = \
+        np.arange(len(cb_tuple))
+    times.flags.writeable = False
+    return times
+
+
+def get_event_times_matrix(cb_list):
+    """
+    This method returns the encodings (see get_event_times()) of all the
+    cbs in 'cb_list', stacked into a matrix of shape (len(cb_list), 18).
+
+    Parameters
+    ----------
+    cb_list: list[list[str]]
+
+    Returns
+    -------
+    np.array[int8]
+
+    """
+    if not cb_list:
+        return np.zeros((0, NUM_EVENTS), dtype=np.int8)
+    return np.stack([get_event_times(tuple(cb)) for cb in cb_list])
+
+
+def cb_is_smaller_than_each(cb, event_times_matrix):
+    """
+    This method is a batch version of cb.cb1_is_smaller_that_cb2(). It
+    tests whether 'cb' is smaller than each of the cbs whose encodings are
+    the rows of 'event_times_matrix' (see get_event_times_matrix()), for
+    example, the first cbs of all the cbLibXs of a collection. 'cb' is
+    smaller than cb2 iff it is shorter than cb2 and the times in cb2 of the
+    events of 'cb' are all defined and strictly increasing. This takes
+    only a couple of vectorized comparisons for all the rows at once.
+
+    Parameters
+    ----------
+    cb: list[str]
+    event_times_matrix: np.array[int8]
+
+    Returns
+    -------
+    np.array[bool]
+        array whose entry i is True iff 'cb' is smaller than the cb of row
+        i
+
+    """
+    times = event_times_matrix[:, [EVENT_TO_CODE[event] for event in cb]]
+    lengths = (event_times_matrix >= 0).sum(axis=1)
+    return (lengths > len(cb)) & (times >= 0).all(axis=1) & \
+        (np.diff(times, axis=1) > 0).all(axis=1)
@@ -0,0 +1,230 @@
+from itertools import islice
+from cb import *
+from CbLibXColl import *
+from profiling import *
+
+"""These are methods for enumerating all the 255,168 possible cbs/games of
+Tic-Tac-Toe, instead of sampling them at random with cb.create_cb(). The
+enumeration can optionally be reduced by the 8 symmetries of the grid (the
+dihedral group D4: 4 rotations, each optionally followed by a reflection).
+Each game is then represented by one canonical game, together with the
+number of distinct games (its multiplicity) that are symmetric to it.
+
+The collection of cbLibXs of all the games (see
+create_exhaustive_coll_of_cbLibXs()) is not reduced by symmetry: the
+canonical form of a cb is not in general smaller than the canonical form of
+a cbLibX head that admits it, so the cbLibXs of the canonical games are not
+the canonical forms of the cbLibXs of all the games. """
+
+# number of completed Tic-Tac-Toe games
+NUM_GAMES = 255168
+
+
+def rotate(pos):
+    """
+    Returns the position that 'pos' goes to when the grid is rotated 90
+    degrees clockwise.
+
+    Parameters
+    ----------
+    pos: int
+
+    Returns
+    -------
+    int
+
+    """
+    row, col = divmod(pos, 3)
+    return 3*col + 2 - row
+
+
+def reflect(pos):
+    """
+    Returns the position that 'pos' goes to when the grid is reflected
+    about its vertical axis.
+
+    Parameters
+    ----------
+    pos: int
+
+    Returns
+    -------
+    int
+
+    """
+    row, col = divmod(pos, 3)
+    return 3*row + 2 - col
+
+
+def get_symmetries():
+    """
+    Returns the 8 symmetries of the grid, each as a tuple mapping
+    position to transformed position. The first one is the identity.
+
+    Returns
+    -------
+    list[tuple(int)]
+
+    """
+    symmetries = []
+    for num_reflections in range(2):
+        for num_rotations in range(4):
+            perm = []
+            for pos in range(9):
+                for _ in range(num_rotations):
+                    pos = rotate(pos)
+                for _ in range(num_reflections):
+                    pos = reflect(pos)
+                perm.append(pos)
+            symmetries.append(tuple(perm))
+    return symmetries
+
+
+SYMMETRIES = get_symmetries()
+
+# EMPTY_SPACES_SORTED[mask] lists the positions not in 'mask' in increasing
+# order
+EMPTY_SPACES_SORTED = tuple(sorted(spaces) for spaces in EMPTY_SPACES)
+
+
+def canonical_moves(moves):
+    """
+    Returns the canonical form of the game with positions 'moves' (in the
+    order they were played), which is the lexicographically smallest of
+    its 8 symmetric images, and its multiplicity, which is the number of
+    distinct symmetric images.
+
+    Parameters
+    ----------
+    moves: list[int]
+
+    Returns
+    -------
+    tuple(int), int
+
+    """
+    images = {tuple(perm[pos] for pos in moves) for perm in SYMMETRIES}
+    return min(images), len(images)
+
+
+def canonical_cb(cb):
+    """
+    Same as canonical_moves() but for a cb in the usual list[str] format.
+
+    Parameters
+    ----------
+    cb: list[str]
+
+    Returns
+    -------
+    list[str], int
+
+    """
+    moves, multiplicity = canonical_moves([int(frame[1]) for frame in cb])
+    players = 'XO' * 5
+    return [players[time] + str(pos) for time, pos in enumerate(moves)], \
+        multiplicity
+
+
+def gen_all_bitboards(canonical=False):
+    """
+    This method is a generator that yields, lazily and in lexicographic
+    order of the positions played, the bitboards (x_mask, o_mask, moves) (
+    see cb.py) of all the completed Tic-Tac-Toe games.
+
+    If canonical=True, only the canonical games (see canonical_moves()) are
+    yielded. The search tree is then pruned at every incomplete game that
+    has a lexicographically smaller symmetric image, because none of its
+    completions can be canonical.
+
+    Parameters
+    ----------
+    canonical: bool
+
+    Returns
+    -------
+    generator[(int, int, list[int])]
+
+    """
+    # 'perms' is the list of the non-identity symmetries that map the
+    # moves so far to themselves. The other symmetries already map them to
+    # a lexicographically larger image, so they can be ignored.
+    masks = [0, 0]
+    moves = []
+
+    def gen(perms):
+        player = len(moves) % 2
+        for pos in EMPTY_SPACES_SORTED[masks[0] | masks[1]]:
+            if canonical:
+                new_perms = []
+                is_canonical = True
+                for perm in perms:
+                    if perm[pos] < pos:
+                        is_canonical = False
+                        break
+                    if perm[pos] == pos:
+                        new_perms.append(perm)
+                if not is_canonical:
+                    continue
+            else:
+                new_perms = perms
+            masks[player] |= 1 << pos
+            moves.append(pos)
+            if bitboard_has_ended(masks[0], masks[1]):
+                yield masks[0], masks[1], list(moves)
+            else:
+                yield from gen(new_perms)
+            moves.pop()
+            masks[player] ^= 1 << pos
+
+    yield from gen(SYMMETRIES[1:])
+
+
+def gen_all_cbs(canonical=False):
+    """
+    This method is a generator that yields, lazily, all the completed
+    Tic-Tac-Toe cbs/games. If canonical=False, it yields each of the
+    255,168 games as a list[str]. If canonical=True, it yields a pair (cb,
+    multiplicity) for each of the 31,896 canonical games (see
+    canonical_moves()). The multiplicities add up to 255,168.
+
+    Parameters
+    ----------
+    canonical: bool
+
+    Returns
+    -------
+    generator[list[str]] or generator[(list[str], int)]
+
+    """
+    for x_mask, o_mask, moves in gen_all_bitboards(canonical):
+        cb = bitboard_to_cb(x_mask, o_mask, moves)
+        if canonical:
+            yield cb, len({tuple(perm[pos] for pos in moves)
+                           for perm in SYMMETRIES})
+        else:
+            yield cb
+
+
+@profiled()
+def create_exhaustive_coll_of_cbLibXs(num_cbs=None):
+    """
+    This method returns a collection of cbLibXs built, like
+    cb.create_coll_of_cbLibXs(), with CbLibXColl, but from all the
+    NUM_GAMES possible Tic-Tac-Toe games, each inserted once, in the order
+    yielded by gen_all_cbs(). Since no game is repeated, there are no
+    republished cbs.
+
+    Parameters
+    ----------
+    num_cbs: int | None
+        if not None, only the first 'num_cbs' games are inserted
+
+    Returns
+    -------
+    list[list[list[str]]
+
+    """
+    coll = CbLibXColl()
+    coll.add_cbs(islice(gen_all_cbs(), num_cbs))
+    return coll.coll_of_cbLibXs
@@ -0,0 +1,220 @@
+import os
+import numpy as np
+from cb_batch import *
+
+"""These are methods for saving cbs and collections of cbLibXs to disk in a
+compact binary format, and for loading them back lazily.
+
+A list of N cbs is saved as a .npy file holding the (N, 9) int8 'moves'
+array of cb_batch.py: row i gives the positions played in cb i, in
+chronological order, padded with -1. Since X always plays first, this is
+enough to reproduce the list[str] cbs exactly.
+
+A collection of cbLibXs is saved as a directory with two .npy files:
+'moves.npy' holds the moves of all the cbs of all the cbLibXs, one cbLibX
+after the other, and 'offsets.npy' holds an int64 array of length
+num_cbLibXs + 1 such that the cbs of cbLibX i are the rows offsets[i] to
+offsets[i+1] - 1 of 'moves.npy'.
+
+All the readers open the .npy files with np.load(mmap_mode='r'), which
+returns an np.memmap, so opening a file of any size is near-instant and
+only the rows that are actually used are read from disk. """
+
+# number of rows converted to list[str] cbs at a time by the readers
+CHUNK_SIZE = 4096
+
+
+def cbs_to_moves(cb_list):
+    """
+    This method returns the (N, 9) int8 moves array for the list of cbs
+    'cb_list'. It checks that each cb alternates between X and O starting
+    with X, since otherwise the cb could not be reproduced from its moves.
+
+    Parameters
+    ----------
+    cb_list: list[list[str]]
+
+    Returns
+    -------
+    np.array[int8]
+
+    """
+    for cb in cb_list:
+        assert all(frame[0] == 'XO'[time % 2]
+                   for time, frame in enumerate(cb))
+    moves, _ = cbs_to_cb_batch(cb_list)
+    return moves
+
+
+def moves_to_cbs(moves):
+    """
+    This method returns the list of cbs (in the list[str] format) with
+    moves array 'moves'.
+
+    Parameters
+    ----------
+    moves: np.array[int8]
+
+    Returns
+    -------
+    list[list[str]]
+
+    """
+    moves = np.asarray(moves)
+    return cb_batch_to_cbs(moves, (moves >= 0).sum(axis=1))
+
+
+def write_cbs(path, cb_list):
+    """
+    This method saves the list of cbs 'cb_list' to the .npy file 'path'.
+
+    Parameters
+    ----------
+    path: str
+    cb_list: list[list[str]]
+
+    Returns
+    -------
+    None
+
+    """
+    np.save(path, cbs_to_moves(cb_list))
+
+
+def load_moves(path):
+    """
+    This method returns the moves array saved in the .npy file 'path' as a
+    read-only np.memmap.
+
+    Parameters
+    ----------
+    path: str
+
+    Returns
+    -------
+    np.memmap[int8]
+
+    """
+    return np.load(path, mmap_mode='r')
+
+
+def gen_cbs_from_moves(moves, start=0, stop=None):
+    """
+    This method is a generator that yields, lazily, the cbs in rows
+    'start' to 'stop' - 1 of the moves array 'moves' (e.g., an
+    np.memmap). The rows are converted CHUNK_SIZE at a time.
+
+    Parameters
+    ----------
+    moves: np.array[int8]
+    start: int
+    stop: int | None
+
+    Returns
+    -------
+    generator[list[str]]
+
+    """
+    if stop is None:
+        stop = len(moves)
+    for chunk_start in range(start, stop, CHUNK_SIZE):
+        chunk_stop = min(chunk_start + CHUNK_SIZE, stop)
+        yield from moves_to_cbs(moves[chunk_start:chunk_stop])
+
+
+def gen_cbs_from_file(path):
+    """
+    This method is a generator that yields, lazily, the cbs saved in the
+    .npy file 'path' by write_cbs().
+
+    Parameters
+    ----------
+    path: str
+
+    Returns
+    -------
+    generator[list[str]]
+
+    """
+    yield from gen_cbs_from_moves(load_moves(path))
+
+
+def write_coll_of_cbLibXs(dir_path, coll_of_cbLibXs):
+    """
+    This method saves the collection of cbLibXs 'coll_of_cbLibXs' to the
+    directory 'dir_path', which is created if it doesn't exist.
+
+    Parameters
+    ----------
+    dir_path: str
+    coll_of_cbLibXs: list[list[list[str]]]
+
+    Returns
+    -------
+    None
+
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    offsets = np.zeros((len(coll_of_cbLibXs) + 1,), dtype=np.int64)
+    offsets[1:] = np.cumsum([len(cbLibX) for cbLibX in coll_of_cbLibXs])
+    all_cbs = [cb for cbLibX in coll_of_cbLibXs for cb in cbLibX]
+    np.save(os.path.join(dir_path, 'moves.npy'), cbs_to_moves(all_cbs))
+    np.save(os.path.join(dir_path, 'offsets.npy'), offsets)
+
+
+def load_coll_of_cbLibXs(dir_path):
+    """
+    This method returns the moves and offsets arrays of the collection of
+    cbLibXs saved in the directory 'dir_path', both as read-only
+    np.memmaps.
+
+    Parameters
+    ----------
+    dir_path: str
+
+    Returns
+    -------
+    np.memmap[int8], np.memmap[int64]
+
+    """
+    return np.load(os.path.join(dir_path, 'moves.npy'), mmap_mode='r'), \
+        np.load(os.path.join(dir_path, 'offsets.npy'), mmap_mode='r')
+
+
+def get_cbLibX(moves, offsets, lib):
+    """
+    This method returns the cbLibX with index 'lib' of the collection with
+    arrays 'moves' and 'offsets' (see load_coll_of_cbLibXs()).
+
+    Parameters
+    ----------
+    moves: np.array[int8]
+    offsets: np.array[int64]
+    lib: int
+
+    Returns
+    -------
+    list[list[str]]
+
+    """
+    return moves_to_cbs(moves[offsets[lib]:offsets[lib + 1]])
+
+
+def gen_cbLibXs_from_dir(dir_path):
+    """
+    This method is a generator that yields, lazily, the cbLibXs of the
+    collection saved in the directory 'dir_path' by
+    write_coll_of_cbLibXs().
+
+    Parameters
+    ----------
+    dir_path: str
+
+    Returns
+    -------
+    generator[list[list[str]]]
+
+    """
+    moves, offsets = load_coll_of_cbLibXs(dir_path)
+    for lib in range(len(offsets) - 1):
+        yield get_cbLibX(moves, offsets, lib)
@@ -0,0 +1,113 @@
+import numpy as np
+from events import *
+from event_vocab import *
+from profiling import *
+
+"""These are methods for building the binary dataset that is used to
+upgrade a high frequency arrows DAG to a bnet (see BayesNet.py). For a
+cbLibX, the dataset has one row per cb of the cbLibX and one column per
+distinct event of the first (i.e., largest) cb of the cbLibX, in
+chronological order (see get_dataset_columns()). The entry for a cb and an event is 1
+iff the event occurs in the cb.
+
+The dataset can be stored packed, with 8 columns per byte, as returned by
+np.packbits(matrix, axis=1). """
+
+
+@profiled()
+def get_dataset_matrix(cbLibX):
+    """
+    This method returns the dataset of 'cbLibX' as a boolean matrix,
+    built in one vectorized pass over the event codes of all its cbs. The
+    columns are in the order of the events of cbLibX[0] (see
+    get_dataset_columns()). cbLibXs that are not made of Tic-Tac-Toe cbs
+    (e.g., with multi-event frames) are encoded with an
+    event_vocab.EventVocab instead.
+
+    Parameters
+    ----------
+    cbLibX: list[list[str | list[str]]]
+
+    Returns
+    -------
+    np.array[bool]
+        array of shape (len(cbLibX), number of events of cbLibX[0])
+
+    """
+    if not is_tic_tac_toe_cb_list(cbLibX):
+        return get_vocab_dataset_matrix(EventVocab(), cbLibX)[0]
+    codes = moves_to_event_codes(cbs_to_cb_batch(cbLibX)[0])
+    num_cbs = len(codes)
+    # the padding code -1 marks the extra last column, which is dropped
+    has_event = np.zeros((num_cbs, NUM_EVENTS + 1), dtype=bool)
+    has_event[np.arange(num_cbs)[:, np.newaxis], codes] = True
+    return has_event[:, [EVENT_TO_CODE[event] for event in cbLibX[0]]]
+
+
+def get_dataset_columns(cbLibX):
+    """
+    This method returns the names of the columns of the dataset of
+    'cbLibX', i.e., the distinct events of cbLibX[0], in order of first
+    occurrence.
+
+    Parameters
+    ----------
+    cbLibX: list[list[str | list[str]]]
+
+    Returns
+    -------
+    list[str]
+
+    """
+    return list(dict.fromkeys(get_cb_events(cbLibX[0])[0]))
+
+
+def pack_dataset(matrix):
+    """
+    This method packs a binary dataset matrix, with 8 columns per byte.
+
+    Parameters
+    ----------
+    matrix: np.array[bool]
+
+    Returns
+    -------
+    np.array[uint8]
+
+    """
+    return np.packbits(np.asarray(matrix, dtype=bool), axis=1)
+
+
+def unpack_dataset_column(packed_dataset, col):
+    """
+    This method returns column 'col' of a packed dataset.
+
+    Parameters
+    ----------
+    packed_dataset: np.array[uint8]
+    col: int
+
+    Returns
+    -------
+    np.array[uint8]
+
+    """
+    return (packed_dataset[:, col // 8] >> (7 - col % 8)) & 1
+
+
+def get_packed_dataset(cbLibX):
+    """
+    This method returns the packed dataset of 'cbLibX', and the names of
+    its columns.
+
+    Parameters
+    ----------
+    cbLibX: list[list[str | list[str]]]
+
+    Returns
+    -------
+    np.array[uint8], list[str]
+
+    """
+    return pack_dataset(get_dataset_matrix(cbLibX)), \
+        get_dataset_columns(cbLibX)
@@ -1,8 +1,12 @@
-import graphviz as gv
-from IPython.display import display, Image
-from PIL.Image import open as open_image
+from render_cache import *
+from frames import *
 
-"""dot is the language used by graphviz."""
+"""dot is the language used by graphviz.
+
+The methods that build dot strings only need the standard library, so they
+can run on headless machines. graphviz, IPython and PIL are only imported,
+lazily, by the methods that draw (see get_source() and draw_dot()). The
+pngs are rendered through the cache of render_cache.py. """
 
 
 def dot_for_cb(cb, memory_time, graph_name='', is_subgraph=False):
@@ -11,10 +15,13 @@ def dot_for_cb(cb, memory_time, graph_name='', is_subgraph=False):
     list of the arrows of the DAG. The DAG is created from 'cb' as follows.
     For every event e in cb, we draw arrows e1->e, where e1 occurs a time t
     earlier than e, where t in {1, 2, ..., memory_time-1, memory_time}.
+    If a frame of cb has several events (see frames.py), there is an arrow
+    from each of them to each event of the later frames within
+    'memory_time'.
 
     Parameters
     ----------
-    cb: list[str]
+    cb: list[str | list[str]]
     memory_time: int
     graph_name: str
     is_subgraph: bool
@@ -25,24 +32,30 @@ def dot_for_cb(cb, memory_time, graph_name='', is_subgraph=False):
 
     """
     arrows = []
+    if is_single_event_cb(cb):
+        for event_i, event in enumerate(cb):
+            for delta in range(memory_time):
+                j = event_i - delta - 1
+                if j >= 0:
+                    arrows.append((cb[j], event))
+    else:
+        frames = [get_frame_events(frame) for frame in cb]
+        for frame_i, frame in enumerate(frames):
+            for delta in range(memory_time):
+                j = frame_i - delta - 1
+                if j >= 0:
+                    arrows += [(event1, event) for event1 in frames[j]
+                               for event in frame]
     if is_subgraph:
-        dot = "subgraph {\n"
+        lines = ["subgraph {\n"]
+        lines += [arrow[0] + "_" + graph_name +
+                  " -> " +
+                  arrow[1] + "_" + graph_name + ';\n' for arrow in arrows]
     else:
-        dot = "digraph {\n"
-    for event_i, event in enumerate(cb):
-        for delta in range(memory_time):
-            j = event_i - delta - 1
-            if j >= 0:
-                arrows.append((cb[j], event))
-                if not is_subgraph:
-                    dot += cb[j] + " -> " + event + ';\n'
-                else:
-                    dot += cb[j] + "_" + graph_name + \
-                           " -> " + \
-                           event + "_" + graph_name + ';\n'
-
-    dot += "}\n"
-    return dot, arrows
+        lines = ["digraph {\n"]
+        lines += [arrow[0] + " -> " + arrow[1] + ';\n' for arrow in arrows]
+    lines.append("}\n")
+    return "".join(lines), arrows
 
 
 def dot_for_high_freq_arrows_DAG(arrow_freq_dict, arr_rep_th):
@@ -72,21 +85,44 @@ def dot_for_high_freq_arrows_DAG(arrow_freq_dict, arr_rep_th):
 
     """
     arrows = []
-    dot = "digraph {\n"
+    lines = ["digraph {\n"]
     for arrow, freq in arrow_freq_dict.items():
         if freq >= arr_rep_th:
             arrows.append(arrow)
-            dot += arrow[0] + " -> " + arrow[1] + \
-                ' [label=' + str(freq) + "];\n"
-    dot += "}\n"
-    return dot, arrows
+            lines.append(arrow[0] + " -> " + arrow[1] +
+                         ' [label=' + str(freq) + "];\n")
+    lines.append("}\n")
+    return "".join(lines), arrows
+
+
+def get_source(dot, filename):
+    """
+    This method returns the graphviz Source() for the dot string 'dot'.
+    graphviz is imported here, on the first call, rather than at module
+    load.
+
+    Parameters
+    ----------
+    dot: str
+    filename: str
+
+    Returns
+    -------
+    graphviz.Source
+
+    """
+    import graphviz as gv
+    return gv.Source(dot, filename=filename, format="png")
 
 
 def draw_dot(s, j_embed):
     """
     Using display(s) will draw the graph but will not embed it permanently
     in the notebook. To embed it permanently, must generate temporary image
-    file and use Image().display(s)
+    file and use Image().display(s). The image file is the png of the dot
+    string of 's' in the render cache (see render_cache.render_dot()), so
+    each distinct graph is only rendered once, and concurrent runs don't
+    overwrite each other's images.
 
     Parameters
     ----------
@@ -101,8 +137,10 @@ def draw_dot(s, j_embed):
     None
 
     """
-    x = s.render("tempo", format='png', view=False)
+    x = render_dot(s.source)
     if j_embed:
+        from IPython.display import display, Image
         display(Image(x))
     else:
-        open_image("tempo.png").show()
+        from PIL.Image import open as open_image
+        open_image(x).show()
@@ -0,0 +1,365 @@
+import numpy as np
+from frames import *
+
+"""These are methods for cbs whose frames can have several simultaneous
+events, as in the general case of the arXiv paper. A frame is either a
+single event descriptor (a string, as in the Tic-Tac-Toe example) or a
+list of event descriptors.
+
+Comparing descriptor strings gets slow, and storing them gets big, as the
+vocabulary of events grows. So each descriptor is interned by an
+EventVocab, i.e., mapped, once, to a small integer id, and a cb is encoded
+as two integer arrays of the same length, with one entry per event: the
+ids of its events and the times (frame indices) at which they occur, in
+chronological order. A list of cbs is encoded by concatenating the arrays
+of all the cbs, plus an array 'offsets' such that the events of cb i are
+the entries offsets[i]:offsets[i+1].
+
+The arrow counting and dataset building methods below work on these
+arrays only. Arrow counts are kept sparse, as (src, dst, count) arrays,
+since a dense count matrix grows as the square of the vocabulary size.
+The cb comparison works on the ids too, but as python ints: cbs are short,
+so a dictionary look-up per event is faster than numpy there, and the
+dictionary of the larger cb (e.g., the head of a cbLibX) can be built once
+and reused (see get_id_to_time()). An EventVocab created with
+events.EVENTS gives the 18 Tic-Tac-Toe events the same ids as their
+events.py codes.
+
+These methods are used by CbLibXColl, dataset.get_dataset_matrix(),
+arrow_counts.get_arrow_freq_dict() and threshold_sweep.py for cbs that
+are not Tic-Tac-Toe games. """
+
+
+class EventVocab:
+    """
+    This class interns event descriptors, i.e., it maps each distinct
+    descriptor to an integer id, in order of first appearance, and
+    encodes cbs as integer arrays.
+
+    Attributes
+    ----------
+    events: list[str]
+        list of the interned descriptors. events[id] is the descriptor
+        with id 'id'.
+    event_to_id: dict[str, int]
+        dictionary mapping descriptor to id
+
+    """
+
+    def __init__(self, events=None):
+        """
+
+        Parameters
+        ----------
+        events: list[str] | None
+            descriptors to intern initially, in this order
+        """
+        self.events = []
+        self.event_to_id = {}
+        if events:
+            for event in events:
+                self.intern(event)
+
+    def __len__(self):
+        return len(self.events)
+
+    def intern(self, event):
+        """
+        This method returns the id of the descriptor 'event', giving it a
+        new id first if it has none yet.
+
+        Parameters
+        ----------
+        event: str
+
+        Returns
+        -------
+        int
+
+        """
+        event_id = self.event_to_id.get(event)
+        if event_id is None:
+            event_id = len(self.events)
+            self.event_to_id[event] = event_id
+            self.events.append(event)
+        return event_id
+
+    def encode_cb_as_lists(self, cb):
+        """
+        This method returns the ids and times of all the events of 'cb', as
+        lists.
+
+        Parameters
+        ----------
+        cb: list[str | list[str]]
+
+        Returns
+        -------
+        list[int], list[int]
+
+        """
+        ids = []
+        times = []
+        for time, frame in enumerate(cb):
+            if isinstance(frame, str):
+                ids.append(self.intern(frame))
+                times.append(time)
+            else:
+                for event in frame:
+                    ids.append(self.intern(event))
+                    times.append(time)
+        return ids, times
+
+    def encode_cb(self, cb):
+        """
+        This method returns the ids and times of all the events of 'cb'.
+
+        Parameters
+        ----------
+        cb: list[str | list[str]]
+
+        Returns
+        -------
+        np.array[int32], np.array[int32]
+
+        """
+        ids, times = self.encode_cb_as_lists(cb)
+        return np.array(ids, dtype=np.int32), \
+            np.array(times, dtype=np.int32)
+
+    def encode_cbs(self, cb_list):
+        """
+        This method returns the concatenated ids and times of the events of
+        all the cbs in 'cb_list', and their offsets.
+
+        Parameters
+        ----------
+        cb_list: list[list[str | list[str]]]
+
+        Returns
+        -------
+        np.array[int32], np.array[int32], np.array[int64]
+
+        """
+        encoded_cbs = [self.encode_cb(cb) for cb in cb_list]
+        offsets = np.zeros((len(cb_list) + 1,), dtype=np.int64)
+        offsets[1:] = np.cumsum([len(ids) for ids, _ in encoded_cbs])
+        if not encoded_cbs:
+            empty = np.zeros((0,), dtype=np.int32)
+            return empty, empty, offsets
+        return np.concatenate([ids for ids, _ in encoded_cbs]), \
+            np.concatenate([times for _, times in encoded_cbs]), \
+            offsets
+
+    def get_events(self, ids):
+        """
+        This method returns the descriptors with ids 'ids'.
+
+        Parameters
+        ----------
+        ids: np.array[int] | list[int]
+
+        Returns
+        -------
+        list[str]
+
+        """
+        return [self.events[event_id] for event_id in np.asarray(ids).tolist()]
+
+
+def count_encoded_arrows(ids, times, offsets, memory_time, num_events):
+    """
+    This method counts the arrows e1->e2 of all the encoded cbs (ids,
+    times, offsets), where e1 occurs a time t earlier than e2 in the same
+    cb, with t in {1, 2, ..., memory_time}. For single event frames, these
+    are the arrows of dot.dot_for_cb().
+
+    Since the events of each cb are in chronological order, the event at
+    index i+k of the concatenated arrays is, for each k, either in the same
+    cb as the event at index i and at least as late, or in a later cb. So
+    the arrows are found by comparing the arrays with themselves shifted by
+    k = 1, 2, ..., until no event is within 'memory_time' of the event k
+    places after it.
+
+    Parameters
+    ----------
+    ids: np.array[int32]
+    times: np.array[int32]
+    offsets: np.array[int64]
+    memory_time: int
+    num_events: int
+        size of the vocabulary (all ids are smaller than this)
+
+    Returns
+    -------
+    np.array[int64], np.array[int64], np.array[int64]
+        the ids of the source and destination of each distinct arrow, and
+        the number of times it occurs, ordered by (src, dst)
+
+    """
+    cb_index = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    keys = []
+    for k in range(1, len(ids)):
+        delay = times[k:] - times[:-k]
+        in_window = (cb_index[k:] == cb_index[:-k]) & (delay <= memory_time)
+        if not in_window.any():
+            break
+        is_arrow = in_window & (delay >= 1)
+        keys.append(ids[:-k][is_arrow].astype(np.int64) * num_events +
+                    ids[k:][is_arrow])
+    if not keys:
+        empty = np.zeros((0,), dtype=np.int64)
+        return empty, empty, empty
+    keys, counts = np.unique(np.concatenate(keys), return_counts=True)
+    return keys // num_events, keys % num_events, counts.astype(np.int64)
+
+
+def encoded_arrows_to_arrow_freq_dict(vocab, src_ids, dst_ids, counts):
+    """
+    This method converts the sparse arrow counts returned by
+    count_encoded_arrows() into the arrow frequency dictionary used by
+    dot.dot_for_high_freq_arrows_DAG().
+
+    Parameters
+    ----------
+    vocab: EventVocab
+    src_ids: np.array[int64]
+    dst_ids: np.array[int64]
+    counts: np.array[int64]
+
+    Returns
+    -------
+    dict[(str,str), int]
+
+    """
+    return dict(zip(zip(vocab.get_events(src_ids), vocab.get_events(dst_ids)),
+                    counts.tolist()))
+
+
+def get_id_to_time(ids, times):
+    """
+    This method returns the encoding of an encoded cb (ids, times) used by
+    encoded_cb1_is_smaller_than_cb2() for the larger cb: a dictionary
+    mapping each id to its time, and the number of events. It is None
+    instead of a dictionary if some event occurs more than once.
+
+    Parameters
+    ----------
+    ids: list[int] | np.array[int]
+    times: list[int] | np.array[int]
+
+    Returns
+    -------
+    dict[int, int] | None, int
+
+    """
+    ids = np.asarray(ids).tolist()
+    times = np.asarray(times).tolist()
+    return get_event_to_time_of_events(ids, times), len(ids)
+
+
+def get_vocab_arrow_freq_dict(cb_list, memory_time, vocab=None):
+    """
+    This method returns the arrow frequency dictionary (see
+    dot.dot_for_high_freq_arrows_DAG()) of all the cbs in 'cb_list', with
+    memory time 'memory_time', counted on the encoded cbs (see
+    count_encoded_arrows()).
+
+    Parameters
+    ----------
+    cb_list: list[list[str | list[str]]]
+    memory_time: int
+    vocab: EventVocab | None
+        vocabulary used to encode the cbs. If None, a new one is created.
+
+    Returns
+    -------
+    dict[(str,str), int]
+
+    """
+    if vocab is None:
+        vocab = EventVocab()
+    ids, times, offsets = vocab.encode_cbs(cb_list)
+    return encoded_arrows_to_arrow_freq_dict(
+        vocab, *count_encoded_arrows(ids, times, offsets, memory_time,
+                                     len(vocab)))
+
+
+def encoded_cb1_is_smaller_than_cb2(ids1, times1, id_to_time2, num_events2):
+    """
+    This method is the version of cb.cb1_is_smaller_that_cb2() for encoded
+    cbs with (possibly) multi-event frames (see
+    frames.events_are_smaller()). cb2 is given by its encoding
+    (id_to_time2, num_events2), as returned by get_id_to_time(), which can
+    be built once and reused for every cb1 compared with the same cb2. The
+    events of cb2 must be distinct.
+
+    Parameters
+    ----------
+    ids1: list[int]
+    times1: list[int]
+    id_to_time2: dict[int, int]
+    num_events2: int
+
+    Returns
+    -------
+    bool
+
+    """
+    return events_are_smaller(ids1, times1, id_to_time2, num_events2)
+
+
+def get_encoded_dataset_matrix(ids, offsets, column_ids, num_events):
+    """
+    This method returns the binary dataset (see dataset.py) of the encoded
+    cbs (ids, offsets), with one row per cb and one column per id in
+    'column_ids'. The entry for a cb and a column is True iff the event of
+    that column occurs in the cb. It takes one vectorized pass over all the
+    events.
+
+    Parameters
+    ----------
+    ids: np.array[int32]
+    offsets: np.array[int64]
+    column_ids: np.array[int] | list[int]
+    num_events: int
+        size of the vocabulary (all ids are smaller than this)
+
+    Returns
+    -------
+    np.array[bool]
+        array of shape (len(offsets) - 1, len(column_ids))
+
+    """
+    id_to_col = np.full((num_events,), -1, dtype=np.int64)
+    id_to_col[np.asarray(column_ids, dtype=np.int64)] = \
+        np.arange(len(column_ids))
+    num_cbs = len(offsets) - 1
+    rows = np.repeat(np.arange(num_cbs), np.diff(offsets))
+    cols = id_to_col[ids]
+    is_column = cols >= 0
+    matrix = np.zeros((num_cbs, len(column_ids)), dtype=bool)
+    matrix[rows[is_column], cols[is_column]] = True
+    return matrix
+
+
+def get_vocab_dataset_matrix(vocab, cbLibX):
+    """
+    This method is the version of dataset.get_dataset_matrix() for cbs with
+    (possibly) multi-event frames. The columns are the distinct events of
+    cbLibX[0], in order of first occurrence, which are also returned.
+
+    Parameters
+    ----------
+    vocab: EventVocab
+    cbLibX: list[list[str | list[str]]]
+
+    Returns
+    -------
+    np.array[bool], list[str]
+
+    """
+    ids, _, offsets = vocab.encode_cbs(cbLibX)
+    column_ids = list(dict.fromkeys(ids[offsets[0]:offsets[1]].tolist()))
+    return get_encoded_dataset_matrix(ids, offsets, column_ids, len(vocab)), \
+        vocab.get_events(column_ids)
@@ -0,0 +1,103 @@
+import numpy as np
+
+"""These are the integer codes of the 18 Tic-Tac-Toe events, and the
+methods that convert between cbs/games in the usual list[str] format and
+the batches (moves, lengths) of cb_batch.py. They only need numpy, so they
+can be imported without cb.py, which seeds python's 'random' module. """
+
+# Each of the 18 possible events (frames) is given an integer code: pos for
+# 'X'+str(pos) and 9 + pos for 'O'+str(pos).
+EVENTS = ['X' + str(pos) for pos in range(9)] + \
+         ['O' + str(pos) for pos in range(9)]
+NUM_EVENTS = len(EVENTS)
+EVENT_TO_CODE = {event: code for code, event in enumerate(EVENTS)}
+
+
+def is_tic_tac_toe_cb_list(cb_list):
+    """
+    Returns True iff all the cbs in 'cb_list' are Tic-Tac-Toe cbs, i.e.,
+    their frames are single events of EVENTS, played alternately by X and
+    O starting with X, so that they can be encoded by cbs_to_cb_batch().
+
+    Parameters
+    ----------
+    cb_list: list[list[str | list[str]]]
+
+    Returns
+    -------
+    bool
+
+    """
+    players = 'XO' * 5
+    return all(len(cb) <= 9 and
+               all(isinstance(frame, str) and frame in EVENT_TO_CODE and
+                   frame[0] == players[time]
+                   for time, frame in enumerate(cb))
+               for cb in cb_list)
+
+
+def moves_to_event_codes(moves):
+    """
+    This method returns the event codes for a moves array. Since X plays
+    at even times and O at odd times, the code of the move at time t and
+    position pos is pos for X and 9 + pos for O. Padding (-1) stays -1.
+
+    Parameters
+    ----------
+    moves: np.array[int8]
+
+    Returns
+    -------
+    np.array[int64]
+
+    """
+    moves = np.asarray(moves, dtype=np.int64)
+    codes = moves + 9 * (np.arange(moves.shape[1]) % 2)
+    codes[moves < 0] = -1
+    return codes
+
+
+def cb_batch_to_cbs(moves, lengths):
+    """
+    This method converts a batch of cbs (moves, lengths), as returned by
+    cb_batch.create_cb_batch(), to a list of cbs in the usual list[str]
+    format, e.g. ['X2', 'O7', 'X6', 'O4', 'X3', 'O8', 'X0'].
+
+    Parameters
+    ----------
+    moves: np.array[int8]
+    lengths: np.array[int8]
+
+    Returns
+    -------
+    list[list[str]]
+
+    """
+    players = 'XO' * 5
+    cb_list = []
+    for row, length in zip(moves.tolist(), lengths.tolist()):
+        cb_list.append([players[time] + str(row[time])
+                        for time in range(length)])
+    return cb_list
+
+
+def cbs_to_cb_batch(cb_list):
+    """
+    This method is the inverse of cb_batch_to_cbs(). It converts a list of
+    cbs in the usual list[str] format to a batch (moves, lengths).
+
+    Parameters
+    ----------
+    cb_list: list[list[str]]
+
+    Returns
+    -------
+    np.array[int8], np.array[int8]
+
+    """
+    moves = np.full((len(cb_list), 9), -1, dtype=np.int8)
+    lengths = np.zeros((len(cb_list),), dtype=np.int8)
+    for i, cb in enumerate(cb_list):
+        moves[i, :len(cb)] = [int(frame[1]) for frame in cb]
+        lengths[i] = len(cb)
+    return moves, lengths
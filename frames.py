@@ -0,0 +1,175 @@
+"""These are methods for cbs whose frames can have several simultaneous
+events, as in the general case of the arXiv paper (see cb.py). A frame is
+either a single event descriptor (a string, as in the Tic-Tac-Toe example)
+or a list of event descriptors. The events of a cb, in chronological order,
+are given by two lists of the same length: the events themselves, and the
+times (frame indices) at which they occur.
+
+The events can be the descriptors themselves or the integer ids given to
+them by an event_vocab.EventVocab. The methods below work with both. """
+
+
+def get_frame_events(frame):
+    """
+    This method returns the list of event descriptors of the frame
+    'frame'.
+
+    Parameters
+    ----------
+    frame: str | list[str]
+
+    Returns
+    -------
+    list[str]
+
+    """
+    if isinstance(frame, str):
+        return [frame]
+    return list(frame)
+
+
+def is_single_event_cb(cb):
+    """
+    Returns True iff every frame of 'cb' is a single event descriptor.
+
+    Parameters
+    ----------
+    cb: list[str | list[str]]
+
+    Returns
+    -------
+    bool
+
+    """
+    return all(isinstance(frame, str) for frame in cb)
+
+
+def get_cb_key(cb):
+    """
+    This method returns a hashable version of 'cb', with every list frame
+    replaced by a tuple. For a cb of single event frames, this is just
+    tuple(cb).
+
+    Parameters
+    ----------
+    cb: list[str | list[str]]
+
+    Returns
+    -------
+    tuple(str | tuple(str))
+
+    """
+    return tuple(frame if isinstance(frame, str) else tuple(frame)
+                 for frame in cb)
+
+
+def get_cb_events(cb):
+    """
+    This method returns the events of 'cb' and the times at which they
+    occur, in chronological order.
+
+    Parameters
+    ----------
+    cb: list[str | list[str]]
+
+    Returns
+    -------
+    list[str], list[int]
+
+    """
+    events = []
+    times = []
+    for time, frame in enumerate(cb):
+        for event in get_frame_events(frame):
+            events.append(event)
+            times.append(time)
+    return events, times
+
+
+def get_event_to_time_of_events(events, times):
+    """
+    This method returns a dictionary mapping each of the events 'events'
+    to its time, or None if some event occurs more than once.
+
+    Parameters
+    ----------
+    events: list[str | int]
+    times: list[int]
+
+    Returns
+    -------
+    dict[str | int, int] | None
+
+    """
+    event_to_time = dict(zip(events, times))
+    if len(event_to_time) < len(events):
+        return None
+    return event_to_time
+
+
+def frames_are_smaller(cb1, cb2):
+    """
+    This method is the version of events_are_smaller() for a cb2 with
+    repeated events, which compares the cbs as the original
+    cb.cb1_is_smaller_that_cb2() did: cb1 < cb2 iff the events of cb1 are
+    a proper subset of the events of cb2, and keeping only the events of
+    cb2 that occur in cb1, and only the frames that still have some
+    event, gives the frames of cb1 (the order of the events within a frame
+    doesn't matter).
+
+    Parameters
+    ----------
+    cb1: list[str | list[str]]
+    cb2: list[str | list[str]]
+
+    Returns
+    -------
+    bool
+
+    """
+    events1 = set(get_cb_events(cb1)[0])
+    if not events1 < set(get_cb_events(cb2)[0]):
+        return False
+    frames2 = [sorted(event for event in get_frame_events(frame)
+                      if event in events1) for frame in cb2]
+    return [frame for frame in frames2 if frame] == \
+        [sorted(get_frame_events(frame)) for frame in cb1]
+
+
+def events_are_smaller(events1, times1, event_to_time2, num_events2):
+    """
+    This method is the general version of cb.cb1_is_smaller_that_cb2(),
+    for cbs given by their events. cb1 < cb2 iff cb1 has fewer events than
+    cb2, every event of cb1 occurs in cb2, and any two events of cb1 occur
+    in the same order in cb2 (or in the same frame of cb2 iff they are in
+    the same frame of cb1). Since the events of cb1 are in chronological
+    order, it is enough to compare consecutive events. The events of cb2
+    must be distinct, so that they can be given by the dictionary
+    'event_to_time2' (see get_event_to_time_of_events()).
+
+    Parameters
+    ----------
+    events1: list[str | int]
+    times1: list[int]
+    event_to_time2: dict[str | int, int]
+    num_events2: int
+
+    Returns
+    -------
+    bool
+
+    """
+    if len(events1) >= num_events2:
+        return False
+    last_time1 = last_time2 = None
+    for event, time1 in zip(events1, times1):
+        time2 = event_to_time2.get(event)
+        if time2 is None:
+            return False
+        if last_time1 is not None and \
+                (time1 > last_time1) - (time1 < last_time1) != \
+                (time2 > last_time2) - (time2 < last_time2):
+            return False
+        last_time1 = time1
+        last_time2 = time2
+    return True
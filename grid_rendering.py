@@ -0,0 +1,181 @@
+import os
+import json
+from render_cache import *
+from latex_rendering import *
+
+"""These are methods for drawing cbs on Tic-Tac-Toe grids directly with
+matplotlib primitives (lines and plain text), without LaTeX. They show the
+same information, with the same layout, as the latex strings of
+latex_rendering.cb_list_to_latex() rendered by
+latex_rendering.draw_latex_str(): a row of 'nmax' slots, each holding the
+grid of one cb, with each played cell labelled by its player and the time
+it was played, e.g., X(2). No TeX pass is needed, so a figure takes tens of
+milliseconds and can be drawn on headless machines.
+
+The figures are built without pyplot, except by the methods that show
+them, so saving them never opens a window. matplotlib is only imported on
+the first draw. """
+
+# horizontal space between grids, in units of the width of a cell
+GRID_GAP = 1
+# width of the lines of the grids, in points, as in latex_rendering
+LINE_WIDTH = 2
+FONT_SIZE = 9
+# width of the figure, in inches, as in latex_rendering
+FIG_WIDTH = 8
+
+
+def draw_cb_on_axes(ax, cb, x0):
+    """
+    This method draws the grid of 'cb' on the matplotlib axes 'ax', with
+    its left edge at x=x0. Each cell is a unit square, and the grid spans
+    0 <= y <= 3, with position 0 at the top left.
+
+    Parameters
+    ----------
+    ax: matplotlib.axes.Axes
+    cb: list[str]
+    x0: float
+
+    Returns
+    -------
+    None
+
+    """
+    for i in (1, 2):
+        ax.plot([x0 + i, x0 + i], [0, 3], color='black', lw=LINE_WIDTH)
+        ax.plot([x0, x0 + 3], [i, i], color='black', lw=LINE_WIDTH)
+    for pos, label in enumerate(get_cell_labels(cb)):
+        if label:
+            ax.text(x0 + pos % 3 + .5, 2.5 - pos // 3, label,
+                    fontsize=FONT_SIZE,
+                    horizontalalignment='center',
+                    verticalalignment='center',
+                    usetex=False)
+
+
+def create_cb_list_figure(cb_list, nmax, fig=None):
+    """
+    This method draws the grids of all the cbs in 'cb_list', left to
+    right, in a row of 'nmax' slots. Only 0< len(cb_list) <= nmax is
+    allowed, as in latex_rendering.cb_list_to_latex().
+
+    Parameters
+    ----------
+    cb_list: list[list[str]]
+    nmax: int
+    fig: matplotlib.figure.Figure | None
+        figure to draw on. If None, a new figure is created, without
+        pyplot.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+
+    """
+    n = len(cb_list)
+    assert 0 < n <= nmax
+    width = nmax * (3 + GRID_GAP)
+    height = 3 + GRID_GAP
+    fig_size = (FIG_WIDTH, FIG_WIDTH * height / width)
+    if fig is None:
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=fig_size)
+    else:
+        fig.set_size_inches(fig_size)
+    ax = fig.add_axes([0, 0, 1, 1])
+    for k, cb in enumerate(cb_list):
+        draw_cb_on_axes(ax, cb, GRID_GAP / 2 + k * (3 + GRID_GAP))
+    ax.set_xlim(0, width)
+    ax.set_ylim(-GRID_GAP / 2, 3 + GRID_GAP / 2)
+    ax.axis('off')
+    return fig
+
+
+def draw_cb_list(cb_list, nmax):
+    """
+    This method shows the grids of all the cbs in 'cb_list' (see
+    create_cb_list_figure()) with pyplot. It is the LaTeX free version of
+    latex_rendering.draw_latex_str(cb_list_to_latex(cb_list, nmax)).
+
+    Parameters
+    ----------
+    cb_list: list[list[str]]
+    nmax: int
+
+    Returns
+    -------
+    None
+
+    """
+    import matplotlib.pyplot as plt
+    create_cb_list_figure(cb_list, nmax, fig=plt.figure())
+    plt.show()
+
+
+def draw_cb(cb):
+    """
+    This method shows the grid of 'cb' with pyplot.
+
+    Parameters
+    ----------
+    cb: list[str]
+
+    Returns
+    -------
+    None
+
+    """
+    draw_cb_list([cb], 1)
+
+
+def render_cb_list(cb_list, nmax, cache_dir=None):
+    """
+    This method returns the path of a png of the grids of all the cbs in
+    'cb_list', which is drawn only if it is not in the render cache yet
+    (see render_cache.py).
+
+    Parameters
+    ----------
+    cb_list: list[list[str]]
+    nmax: int
+    cache_dir: str | None
+
+    Returns
+    -------
+    str
+
+    """
+    path = get_cache_path("grid", json.dumps([cb_list, nmax]), cache_dir)
+    if not os.path.exists(path):
+        fig = create_cb_list_figure(cb_list, nmax)
+        write_atomically(path, lambda f: fig.savefig(f, format="png"))
+    return path
+
+
+def export_cb_lists(cb_lists, nmax, out_dir, num_workers=1):
+    """
+    This method renders the grids of each cb list in 'cb_lists' (e.g., a
+    collection of cbLibXs, with nmax >= the length of the longest one) to
+    a png in the directory 'out_dir', in parallel over 'num_workers'
+    processes, and returns their paths, in the same order.
+
+    Parameters
+    ----------
+    cb_lists: list[list[list[str]]]
+    nmax: int
+    out_dir: str
+    num_workers: int
+
+    Returns
+    -------
+    list[str]
+
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    args = [(cb_list, nmax, out_dir) for cb_list in cb_lists]
+    if num_workers == 1:
+        return [render_cb_list(*arg) for arg in args]
+    from multiprocessing import Pool
+    with Pool(num_workers) as pool:
+        return pool.starmap(render_cb_list, args)
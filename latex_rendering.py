@@ -1,10 +1,33 @@
-import matplotlib.pyplot as plt
-from matplotlib import rcParams
-rcParams['text.usetex'] = True
+from render_cache import *
 
 """A very convenient way to draw a Tic-Tac-Toe game is to create a latex 
 string for a table in the tabular environment. Then render the latex string 
-using matplotlib. """
+using matplotlib.
+
+Building the latex strings needs no imports. matplotlib (with LaTeX text
+rendering turned on) is only imported when a latex string that is not in the
+render cache is drawn (see render_cache.render_latex()), so importing this
+module is cheap and works on machines without LaTeX. """
+
+
+def get_cell_labels(cb):
+    """
+    This method returns the label of each of the 9 cells of the grid of
+    'cb': letter(time) for the played cells, '' for the others.
+
+    Parameters
+    ----------
+    cb: list[str]
+
+    Returns
+    -------
+    list[str]
+
+    """
+    labels = [''] * 9
+    for time, frame in enumerate(cb):
+        labels[int(frame[1])] = frame[0] + '(' + str(time) + ')'
+    return labels
 
 
 def cb_to_latex(cb):
@@ -24,22 +47,12 @@ def cb_to_latex(cb):
     str
 
     """
+    cells = get_cell_labels(cb)
+    rows = ["&".join(cells[3*i: 3*i + 3]) for i in range(3)]
     latex = r"\setlength\arrayrulewidth{2pt}" \
-            r"\begin{tabular}{c|c|c}" \
-            r"00&11&22\\\hline " \
-            r"33&44&55\\\hline " \
-            r"66&77&88\end{tabular}"
-    used_pos = []
-    for time, frame in enumerate(cb):
-        letter = frame[0]
-        pos = frame[1]
-        new_str = letter + '(' + str(time) + ')'
-        # print("nnmmmkk", time, frame, new_str)
-        latex = latex.replace(pos*2, new_str)
-        used_pos.append(int(pos))
-    unused_pos = [str(i) for i in range(9) if i not in used_pos]
-    for pos in unused_pos:
-        latex = latex.replace(pos*2, '')
+            r"\begin{tabular}{c|c|c}" + \
+            r"\\\hline ".join(rows) + \
+            r"\end{tabular}"
     return latex
 
 
@@ -73,25 +86,30 @@ def cb_list_to_latex(cb_list, nmax):
     return latex
 
 
-def draw_latex_str(latex):
+def draw_latex_str(latex, j_embed=False):
     # https://stackoverflow.com/questions/38168292/
     # render-latex-text-with-python
     """
-    This method renders the latex string 'latex' using matplotlib.
+    This method draws the latex string 'latex'. The image is the png of
+    'latex' in the render cache (see render_cache.render_latex()), so each
+    distinct string is only rendered once by matplotlib.
 
     Parameters
     ----------
     latex: str
+    j_embed: bool
+        True iff want to embed image in jupyter notebook (see
+        dot.draw_dot())
 
     Returns
     -------
     None
 
     """
-    plt.figure(figsize=(8, .8))
-    plt.text(0.5, 0.5, latex,
-             fontsize=9,
-             horizontalalignment='center')
-    plt.axis('off')
-
-    plt.show()
+    x = render_latex(latex)
+    if j_embed:
+        from IPython.display import display, Image
+        display(Image(x))
+    else:
+        from PIL.Image import open as open_image
+        open_image(x).show()
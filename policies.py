@@ -0,0 +1,145 @@
+import random
+from functools import lru_cache
+from cb import *
+
+"""These are move policies for creating cbs/games with cb.create_cb(),
+other than the default one, cb.random_policy(), which plays uniformly at
+random. A move policy is called as policy(x_mask, o_mask, player) for a
+game that has not ended, and returns the position of the next move (see
+cb.random_policy()).
+
+minimax_policy() plays perfectly. It never searches at play time: it
+looks up the position in a transposition table that stores, for each of
+the 5,478 positions that can be reached in Tic-Tac-Toe, its minimax value
+and its optimal moves. The table is computed only once per process, the
+first time it is needed (see get_minimax_table()). Worker processes
+created by forking (e.g., by multiprocessing.Pool on Linux) after the table
+has been computed share it, without computing it again, so call
+get_minimax_table() before creating the pool.
+
+EpsilonGreedyPolicy plays at random with probability epsilon, and
+perfectly otherwise, which gives games that are neither random nor all
+draws. All the policies draw their random numbers from python's 'random'
+module, so seeded runs are reproducible. """
+
+
+@lru_cache(maxsize=None)
+def get_minimax_table():
+    """
+    This method returns the transposition table of Tic-Tac-Toe. It maps
+    each position (x_mask, o_mask) that can be reached from the empty grid
+    to its minimax value (1 if X wins, -1 if O wins, and 0 if there is a
+    draw, when both players play perfectly from that position) and the
+    tuple of optimal moves of the player to play (empty if the game has
+    ended). It is computed by a memoized depth first search, only on the
+    first call. The returned dictionary must not be modified.
+
+    Returns
+    -------
+    dict[(int, int), (int, tuple(int))]
+
+    """
+    table = {}
+
+    def solve(x_mask, o_mask):
+        if (x_mask, o_mask) in table:
+            return table[x_mask, o_mask][0]
+        if MASK_HAS_WIN[x_mask]:
+            value, best_moves = 1, ()
+        elif MASK_HAS_WIN[o_mask]:
+            value, best_moves = -1, ()
+        elif x_mask | o_mask == 0b111111111:
+            value, best_moves = 0, ()
+        else:
+            x_to_play = bin(x_mask).count('1') == bin(o_mask).count('1')
+            pos_to_value = {}
+            for pos in sorted(EMPTY_SPACES[x_mask | o_mask]):
+                if x_to_play:
+                    pos_to_value[pos] = solve(x_mask | 1 << pos, o_mask)
+                else:
+                    pos_to_value[pos] = solve(x_mask, o_mask | 1 << pos)
+            if x_to_play:
+                value = max(pos_to_value.values())
+            else:
+                value = min(pos_to_value.values())
+            best_moves = tuple(pos for pos, pos_value in pos_to_value.items()
+                               if pos_value == value)
+        table[x_mask, o_mask] = (value, best_moves)
+        return value
+
+    solve(0, 0)
+    return table
+
+
+def minimax_policy(x_mask, o_mask, player):
+    """
+    This move policy returns an optimal move, chosen at random among all
+    the optimal moves, by looking it up in the transposition table (see
+    get_minimax_table()).
+
+    Parameters
+    ----------
+    x_mask: int
+    o_mask: int
+    player: int
+        0 if X is to play, 1 if O is to play
+
+    Returns
+    -------
+    int
+
+    """
+    return random.choice(get_minimax_table()[x_mask, o_mask][1])
+
+
+class EpsilonGreedyPolicy:
+    """
+    This class is a move policy that plays the move of a random policy
+    with probability 'epsilon', and the move of a greedy policy otherwise.
+    Objects of this class can be pickled, so they can be sent to worker
+    processes.
+
+    Attributes
+    ----------
+    epsilon: float
+    greedy_policy: function
+        by default, minimax_policy()
+    random_policy: function
+        by default, cb.random_policy()
+
+    """
+
+    def __init__(self, epsilon,
+                 greedy_policy=minimax_policy,
+                 random_policy=random_policy):
+        """
+
+        Parameters
+        ----------
+        epsilon: float
+        greedy_policy: function
+        random_policy: function
+        """
+        assert 0 <= epsilon <= 1
+        self.epsilon = epsilon
+        self.greedy_policy = greedy_policy
+        self.random_policy = random_policy
+
+    def __call__(self, x_mask, o_mask, player):
+        """
+        This method returns the next move (see cb.random_policy()).
+
+        Parameters
+        ----------
+        x_mask: int
+        o_mask: int
+        player: int
+
+        Returns
+        -------
+        int
+
+        """
+        if random.random() < self.epsilon:
+            return self.random_policy(x_mask, o_mask, player)
+        return self.greedy_policy(x_mask, o_mask, player)
@@ -0,0 +1,319 @@
+import functools
+import json
+import os
+import time
+
+"""These are opt-in profiling hooks for the DEFT pipeline (cbLibX -> dots
+-> arrow counts -> high frequency arrows DAG -> dataset -> bnet). A stage
+of the pipeline is profiled either by running it inside the context
+manager stage(name), or by decorating the function that runs it with
+@profiled(). For each run of a stage, a record with its wall time, its
+peak memory (the largest amount of memory allocated during the run beyond
+what was allocated when it started, measured with tracemalloc) and its
+enclosing stage is written as one JSON line, and the call counts and total
+times of all the stages are accumulated into a summary.
+
+Profiling is disabled by default. While it is disabled, stage() returns a
+shared context manager that does nothing and @profiled() functions only
+check a flag before calling the original function, so the hooks can stay
+in the code at almost no cost. Profiling is turned on by
+enable_profiling() and off by disable_profiling(), which also writes the
+summary.
+
+Example:
+
+    enable_profiling("profile.jsonl")
+    with stage("create coll"):
+        coll_of_cbLibXs, _ = create_indexed_coll_of_cbLibXs(10000)
+    summary = disable_profiling() """
+
+
+class Profiler:
+    """
+    This class holds the state of the profiling while it is enabled. Only
+    one object of this class is active at a time (see enable_profiling()).
+
+    Attributes
+    ----------
+    out: file | None
+        file to which the JSON lines are written, or None to only keep the
+        summary
+    close_out: bool
+        True iff 'out' is closed by close()
+    trace_memory: bool
+        True iff the peak memory of the stages is measured. tracemalloc
+        slows down every allocation, so this can be turned off to measure
+        the wall times more accurately.
+    stack: list[dict]
+        the stages currently running, outermost first
+    stage_to_summary: dict[str, dict]
+        dictionary mapping stage name to {'calls': int, 'total_s': float,
+        'max_peak_bytes': int | None}
+
+    """
+
+    def __init__(self, out=None, trace_memory=True, close_out=False):
+        """
+
+        Parameters
+        ----------
+        out: file | None
+        trace_memory: bool
+        close_out: bool
+        """
+        self.out = out
+        self.close_out = close_out
+        self.trace_memory = trace_memory
+        self.stack = []
+        self.stage_to_summary = {}
+        if trace_memory:
+            import tracemalloc
+            self.tracemalloc = tracemalloc
+            self.started_tracemalloc = not tracemalloc.is_tracing()
+            if self.started_tracemalloc:
+                tracemalloc.start()
+
+    def enter(self, name):
+        """
+        This method starts a run of the stage 'name'.
+
+        Parameters
+        ----------
+        name: str
+
+        Returns
+        -------
+        None
+
+        """
+        entry = {'name': name, 'peak': 0, 'start_mem': 0}
+        if self.trace_memory:
+            current, peak = self.tracemalloc.get_traced_memory()
+            # the peak so far belongs to the enclosing stage, whose own
+            # peak must survive the reset
+            if self.stack:
+                self.stack[-1]['peak'] = max(self.stack[-1]['peak'], peak)
+            self.tracemalloc.reset_peak()
+            entry['start_mem'] = current
+        self.stack.append(entry)
+        entry['start'] = time.perf_counter()
+
+    def exit(self):
+        """
+        This method ends the innermost running stage, writes its record and
+        adds it to the summary.
+
+        Returns
+        -------
+        None
+
+        """
+        wall_s = time.perf_counter() - self.stack[-1]['start']
+        entry = self.stack.pop()
+        peak_bytes = None
+        if self.trace_memory:
+            peak = max(entry['peak'],
+                       self.tracemalloc.get_traced_memory()[1])
+            if self.stack:
+                self.stack[-1]['peak'] = max(self.stack[-1]['peak'], peak)
+            peak_bytes = max(peak - entry['start_mem'], 0)
+        summary = self.stage_to_summary.setdefault(
+            entry['name'], {'calls': 0, 'total_s': 0.,
+                            'max_peak_bytes': peak_bytes})
+        summary['calls'] += 1
+        summary['total_s'] += wall_s
+        if peak_bytes is not None:
+            summary['max_peak_bytes'] = max(summary['max_peak_bytes'],
+                                            peak_bytes)
+        if self.out is not None:
+            self.write({'type': 'stage',
+                        'stage': entry['name'],
+                        'parent': self.stack[-1]['name'] if self.stack
+                        else None,
+                        'wall_s': wall_s,
+                        'peak_bytes': peak_bytes,
+                        'pid': os.getpid()})
+
+    def write(self, record):
+        """
+        This method writes 'record' as one JSON line.
+
+        Parameters
+        ----------
+        record: dict
+
+        Returns
+        -------
+        None
+
+        """
+        self.out.write(json.dumps(record) + "\n")
+
+    def close(self):
+        """
+        This method writes one summary record per stage, closes 'out' if
+        'close_out' is True, and stops tracemalloc if this object started
+        it.
+
+        Returns
+        -------
+        None
+
+        """
+        if self.out is not None:
+            for name, summary in self.stage_to_summary.items():
+                self.write(dict({'type': 'summary', 'stage': name,
+                                 'pid': os.getpid()}, **summary))
+            if self.close_out:
+                self.out.close()
+            else:
+                self.out.flush()
+        if self.trace_memory and self.started_tracemalloc:
+            self.tracemalloc.stop()
+
+
+# the active Profiler, or None if profiling is disabled
+PROFILER = None
+
+
+class NullStage:
+    """
+    This class is the context manager returned by stage() while profiling
+    is disabled. It does nothing.
+
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_STAGE = NullStage()
+
+
+class Stage:
+    """
+    This class is the context manager returned by stage() while profiling
+    is enabled.
+
+    Attributes
+    ----------
+    name: str
+
+    """
+
+    def __init__(self, name):
+        """
+
+        Parameters
+        ----------
+        name: str
+        """
+        self.name = name
+
+    def __enter__(self):
+        PROFILER.enter(self.name)
+        return self
+
+    def __exit__(self, *exc_info):
+        PROFILER.exit()
+        return False
+
+
+def stage(name):
+    """
+    This method returns a context manager that profiles the code it runs
+    as a run of the stage 'name', if profiling is enabled.
+
+    Parameters
+    ----------
+    name: str
+
+    Returns
+    -------
+    Stage | NullStage
+
+    """
+    if PROFILER is None:
+        return NULL_STAGE
+    return Stage(name)
+
+
+def profiled(name=None):
+    """
+    This method returns a decorator that profiles every call of the
+    decorated function as a run of the stage 'name' (the qualified name of
+    the function if None), if profiling is enabled.
+
+    Parameters
+    ----------
+    name: str | None
+
+    Returns
+    -------
+    function
+
+    """
+    def decorator(fun):
+        stage_name = name if name is not None else fun.__qualname__
+
+        @functools.wraps(fun)
+        def wrapper(*args, **kwargs):
+            if PROFILER is None:
+                return fun(*args, **kwargs)
+            PROFILER.enter(stage_name)
+            try:
+                return fun(*args, **kwargs)
+            finally:
+                PROFILER.exit()
+        return wrapper
+    return decorator
+
+
+def enable_profiling(out=None, trace_memory=True):
+    """
+    This method turns profiling on. If it was already on, the previous
+    profiling is turned off first (see disable_profiling()).
+
+    Parameters
+    ----------
+    out: str | file | None
+        path of the JSON lines file (appended to), or an open text file,
+        or None to only keep the summary
+    trace_memory: bool
+        see Profiler
+
+    Returns
+    -------
+    None
+
+    """
+    global PROFILER
+    if PROFILER is not None:
+        disable_profiling()
+    close_out = isinstance(out, str)
+    if close_out:
+        out = open(out, "a")
+    PROFILER = Profiler(out, trace_memory, close_out)
+
+
+def disable_profiling():
+    """
+    This method turns profiling off, writes the summary records and
+    returns the summary. It returns None if profiling was not on.
+
+    Returns
+    -------
+    dict[str, dict] | None
+        see Profiler.stage_to_summary
+
+    """
+    global PROFILER
+    if PROFILER is None:
+        return None
+    profiler = PROFILER
+    PROFILER = None
+    profiler.close()
+    return profiler.stage_to_summary
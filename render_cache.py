@@ -0,0 +1,211 @@
+import hashlib
+import os
+import tempfile
+
+"""These are methods for rendering dot strings (with graphviz) and latex
+strings (with matplotlib) to png files, with a content-addressed cache: the
+png of a source string is stored in the cache directory under the hash of
+that string, so each distinct drawing is only rendered once, no matter how
+many times, or by how many processes, it is asked for.
+
+Each png is first written to a unique temporary file in the cache
+directory and then renamed to its final name with os.replace(), which is
+atomic, so concurrent processes never see (or clobber) a half written png.
+The pngs are made readable by everyone, so a cache directory can be shared,
+but the default cache directory is per user, since other users can't write
+to a directory created by one user.
+
+There is also a batch export mode, which renders many dot or latex strings
+in a process pool into a directory, without displaying anything. graphviz
+and matplotlib are only imported by the rendering methods. """
+
+# default cache directory, one per user (on Windows, the temporary
+# directory is already per user)
+RENDER_CACHE_DIR = os.path.join(
+    tempfile.gettempdir(),
+    "deft_render_cache" +
+    ("_" + str(os.getuid()) if hasattr(os, "getuid") else ""))
+
+
+def get_cache_path(kind, source, cache_dir=None):
+    """
+    This method returns the path of the png of the string 'source' of kind
+    'kind' in the cache directory 'cache_dir' (RENDER_CACHE_DIR if None).
+    The file name is the sha256 hash of the kind and the source.
+
+    Parameters
+    ----------
+    kind: str
+        either 'dot' or 'latex'
+    source: str
+    cache_dir: str | None
+
+    Returns
+    -------
+    str
+
+    """
+    if cache_dir is None:
+        cache_dir = RENDER_CACHE_DIR
+    digest = hashlib.sha256(
+        (kind + "\n" + source).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, kind + "_" + digest + ".png")
+
+
+def write_atomically(path, write):
+    """
+    This method calls write(f) on a unique temporary file f in the
+    directory of 'path', makes it readable by everyone, and then renames
+    that file to 'path'.
+
+    Parameters
+    ----------
+    path: str
+    write: function
+
+    Returns
+    -------
+    None
+
+    """
+    dir_name = os.path.dirname(path)
+    os.makedirs(dir_name, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=".png", dir=dir_name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        # mkstemp() creates the file readable by its owner only
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def render_dot(dot, cache_dir=None):
+    """
+    This method returns the path of a png of the dot string 'dot', which is
+    rendered with graphviz only if it is not in the cache yet.
+
+    Parameters
+    ----------
+    dot: str
+    cache_dir: str | None
+
+    Returns
+    -------
+    str
+
+    """
+    path = get_cache_path("dot", dot, cache_dir)
+    if not os.path.exists(path):
+        import graphviz as gv
+        png = gv.Source(dot).pipe(format="png")
+        write_atomically(path, lambda f: f.write(png))
+    return path
+
+
+def render_latex(latex, cache_dir=None):
+    """
+    This method returns the path of a png of the latex string 'latex',
+    laid out as by latex_rendering.draw_latex_str(), which is rendered with
+    matplotlib only if it is not in the cache yet. The figure is created
+    without pyplot, so no window is opened and no GUI backend is needed.
+
+    Parameters
+    ----------
+    latex: str
+    cache_dir: str | None
+
+    Returns
+    -------
+    str
+
+    """
+    path = get_cache_path("latex", latex, cache_dir)
+    if not os.path.exists(path):
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(8, .8))
+        fig.text(0.5, 0.5, latex,
+                 fontsize=9,
+                 horizontalalignment='center',
+                 usetex=True)
+        write_atomically(path, lambda f: fig.savefig(f, format="png"))
+    return path
+
+
+# dictionary mapping kind to rendering method
+KIND_TO_RENDER = {"dot": render_dot, "latex": render_latex}
+
+
+def export_renders(kind, sources, out_dir, num_workers=1):
+    """
+    This method renders all the strings of kind 'kind' in 'sources' to
+    pngs in the directory 'out_dir', in parallel over 'num_workers'
+    processes, and returns their paths. 'out_dir' is used as the cache
+    directory, so repeated sources are rendered only once, and exporting
+    again to the same directory only renders the new sources.
+
+    Parameters
+    ----------
+    kind: str
+        either 'dot' or 'latex'
+    sources: list[str]
+    out_dir: str
+    num_workers: int
+
+    Returns
+    -------
+    list[str]
+        the path of the png of each string in 'sources', in the same order
+
+    """
+    render = KIND_TO_RENDER[kind]
+    os.makedirs(out_dir, exist_ok=True)
+    unique_sources = list(dict.fromkeys(sources))
+    args = [(source, out_dir) for source in unique_sources]
+    if num_workers == 1:
+        paths = [render(*arg) for arg in args]
+    else:
+        from multiprocessing import Pool
+        with Pool(num_workers) as pool:
+            paths = pool.starmap(render, args)
+    source_to_path = dict(zip(unique_sources, paths))
+    return [source_to_path[source] for source in sources]
+
+
+def export_dots(dots, out_dir, num_workers=1):
+    """
+    This method is export_renders() for dot strings.
+
+    Parameters
+    ----------
+    dots: list[str]
+    out_dir: str
+    num_workers: int
+
+    Returns
+    -------
+    list[str]
+
+    """
+    return export_renders("dot", dots, out_dir, num_workers)
+
+
+def export_latex_strs(latex_strs, out_dir, num_workers=1):
+    """
+    This method is export_renders() for latex strings, e.g., the output of
+    latex_rendering.cb_list_to_latex() for many cbLibXs.
+
+    Parameters
+    ----------
+    latex_strs: list[str]
+    out_dir: str
+    num_workers: int
+
+    Returns
+    -------
+    list[str]
+
+    """
+    return export_renders("latex", latex_strs, out_dir, num_workers)
@@ -1,15 +1,26 @@
 from cb import *
+from CbLibXColl import *
 from latex_rendering import *
 from dot import *
 from BayesNet import *
+from dataset import *
+from cb_batch import *
+from arrow_counts import *
+from policies import *
 
 import pprint
-import pandas as pd
+import numpy as np
 
 
-def test1():
+def test1(j_embed=False):
     """
 
+    Parameters
+    ----------
+    j_embed: bool
+        True iff want to embed the images in a jupyter notebook (see
+        draw_latex_str())
+
     Returns
     -------
     None
@@ -25,14 +36,14 @@ def test1():
     latex = cb_to_latex(cb)
     print(cb)
     print(latex)
-    draw_latex_str(latex)
+    draw_latex_str(latex, j_embed)
 
     latex = cb_list_to_latex(cb_list, 6)
     print(latex)
-    draw_latex_str(latex)
+    draw_latex_str(latex, j_embed)
 
 
-def test2(num_created_cbs=2000):
+def test2(num_created_cbs=2000, indexed=False):
     """
     This method creates a number 'num_created_cbs' of cbs at random using
     cb.create_cb()'. Since the cb are created at random, sometimes the same
@@ -44,14 +55,23 @@ def test2(num_created_cbs=2000):
     Parameters
     ----------
     num_created_cbs: int
+    indexed: bool
+        True iff want to build the collection with
+        CbLibXColl.create_indexed_coll_of_cbLibXs() instead of
+        cb.create_coll_of_cbLibXs(). Both give the same collection, but the
+        indexed one is much faster.
 
     Returns
     -------
     None
 
     """
-    coll_of_cbLibXs, num_republished_cbs = \
-        create_coll_of_cbLibXs(num_created_cbs)
+    if indexed:
+        coll_of_cbLibXs, num_republished_cbs = \
+            create_indexed_coll_of_cbLibXs(num_created_cbs)
+    else:
+        coll_of_cbLibXs, num_republished_cbs = \
+            create_coll_of_cbLibXs(num_created_cbs)
     print("number of created cbs=", num_created_cbs)
     print("number of republished cbs=", num_republished_cbs)
     print("number of cbLibXs=", len(coll_of_cbLibXs))
@@ -73,7 +93,8 @@ def test2(num_created_cbs=2000):
 def test3(draw=True,
           memory_time=2,
           verbose=True,
-          j_embed=False):
+          j_embed=False,
+          profile_path=None):
     """
 
     Parameters
@@ -85,12 +106,18 @@ def test3(draw=True,
         True iff want to embed image in jupyter notebook. If you are using a
         python terminal instead of a jupyter notebook, only j_embed=False
         will draw image.
+    profile_path: str | None
+        If not None, each stage of the pipeline is profiled, and the
+        records are appended to this JSON lines file (see profiling.py).
+        Use draw=False to keep the rendering out of the timings.
 
     Returns
     -------
     None
 
     """
+    if profile_path is not None:
+        enable_profiling(profile_path)
     cbLibX = \
         [
             ['X2', 'O5', 'X7', 'O1', 'X4', 'O0', 'X8', 'O3', 'X6'],
@@ -105,68 +132,875 @@ def test3(draw=True,
         latex = cb_list_to_latex(cbLibX, 4)
         if verbose:
             print(latex)
-        draw_latex_str(latex)
-    all_arrows = []
-    all_dots = 'digraph {\n'
-    for i, cb in enumerate(cbLibX):
-        dot, arrows = dot_for_cb(cb,
-                                 memory_time,
-                                 graph_name=str(i),
-                                 is_subgraph=True)
-        if verbose:
-            print(dot)
-            print(arrows)
-        all_dots += dot
-        all_arrows += arrows
-        if i == len(cbLibX)-1:
-            all_dots += " }"
+        draw_latex_str(latex, j_embed)
+    with stage("dot_for_cb"):
+        all_arrows = []
+        all_dots = 'digraph {\n'
+        for i, cb in enumerate(cbLibX):
+            dot, arrows = dot_for_cb(cb,
+                                     memory_time,
+                                     graph_name=str(i),
+                                     is_subgraph=True)
             if verbose:
-                print(all_dots)
-            if draw:
-                print("DAG for each cb in cbLibX "
-                      "with memory_time=" + str(memory_time) + ":")
-                s = gv.Source(all_dots,
-                           filename="cbLibX",
-                           format="png")
-
-                draw_dot(s, j_embed)
+                print(dot)
+                print(arrows)
+            all_dots += dot
+            all_arrows += arrows
+            if i == len(cbLibX)-1:
+                all_dots += " }"
+                if verbose:
+                    print(all_dots)
+                if draw:
+                    print("DAG for each cb in cbLibX "
+                          "with memory_time=" + str(memory_time) + ":")
+                    draw_dot(get_source(all_dots, "cbLibX"), j_embed)
     if verbose:
         print("all_arrows_list=", all_arrows)
-    arrow_to_freq = {}
-    for arrow in all_arrows:
-        if arrow in arrow_to_freq.keys():
-            arrow_to_freq[arrow] += 1
-        else:
-            arrow_to_freq[arrow] = 1
+    with stage("arrow counts"):
+        arrow_to_freq = {}
+        for arrow in all_arrows:
+            if arrow in arrow_to_freq.keys():
+                arrow_to_freq[arrow] += 1
+            else:
+                arrow_to_freq[arrow] = 1
     print("arrow frequencies dictionary:")
     pprint.pprint(arrow_to_freq)
-    arr_rep_th = 2
-    dot_hfa, arrows_hfa = dot_for_high_freq_arrows_DAG(
-        arrow_to_freq, arr_rep_th)
+    with stage("hfa DAG"):
+        arr_rep_th = 2
+        dot_hfa, arrows_hfa = dot_for_high_freq_arrows_DAG(
+            arrow_to_freq, arr_rep_th)
     if verbose:
         print("dot for hfa DAG:\n", dot_hfa)
     if draw:
         print("high frequency arrows (hfa) DAG"
               " with arrow repetition threshold=" + str(arr_rep_th) + ":")
-        s = gv.Source(dot_hfa,
-                   filename="G_hfa",
-                   format="png")
-        draw_dot(s, j_embed)
-    dataset = {}
-    for event_i, event in enumerate(cbLibX[0]):
-        dataset[event] = [0]*len(cbLibX)
-    for cb_i, cb in enumerate(cbLibX):
-        for event_i, event in enumerate(cbLibX[0]):
-            if event in cb:
-                dataset[event][cb_i] = 1
+        draw_dot(get_source(dot_hfa, "G_hfa"), j_embed)
+    with stage("dataset"):
+        import pandas as pd
+        dataset_df = pd.DataFrame(get_dataset_matrix(cbLibX).astype(int),
+                                  columns=cbLibX[0])
     if verbose:
-        pprint.pprint(dataset)
-    dataset_df = pd.DataFrame(dataset)
+        pprint.pprint(dataset_df.to_dict(orient='list'))
     print("dataset as pandas DataFrame:")
     print(dataset_df)
     bnet_hfa = BayesNet(arrows_hfa, dataset_df)
     print("hfa DAG upgraded to bnet:")
     bnet_hfa.print()
+    if profile_path is not None:
+        print("profile summary:")
+        pprint.pprint(disable_profiling())
+
+
+def test4(num_rows=200, seed=0):
+    """
+    This method checks BayesNet.update() and BayesNet.remove(). Two bnets
+    share a counts cache built on the rows p1, and one of them is updated
+    with the rows p2 and then has them removed again. The updated bnet
+    must always have the TPMs of a bnet built from scratch on its current
+    rows, and the other bnet must keep the TPMs of p1.
+
+    Parameters
+    ----------
+    num_rows: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    rng = np.random.default_rng(seed)
+    columns = ['X0', 'O1', 'X2']
+    p1 = pack_dataset(rng.random((num_rows, 3)) < .5)
+    p2 = pack_dataset(rng.random((num_rows // 2, 3)) < .3)
+    arrows_a = [('X0', 'O1')]
+    arrows_b = [('X0', 'O1'), ('O1', 'X2')]
+
+    def assert_same_TPMs(bnet, arrows, packed_dataset):
+        ref = BayesNet(arrows, packed_dataset=packed_dataset,
+                       columns=columns)
+        for nd in bnet.nodes:
+            assert (bnet.get_TPM(nd, as_array=True) ==
+                    ref.get_TPM(nd, as_array=True)).all()
+
+    counts_cache = {}
+    bnet_a = BayesNet(arrows_a, packed_dataset=p1, columns=columns,
+                      counts_cache=counts_cache)
+    bnet_b = BayesNet(arrows_b, packed_dataset=p1, columns=columns,
+                      counts_cache=counts_cache)
+    bnet_a.update(packed_rows=p2)
+    assert_same_TPMs(bnet_a, arrows_a, np.concatenate([p1, p2]))
+    assert_same_TPMs(bnet_b, arrows_b, p1)
+    bnet_a.remove(packed_rows=p2)
+    assert_same_TPMs(bnet_a, arrows_a, p1)
+    assert_same_TPMs(bnet_b, arrows_b, p1)
+    print("test4: update() and remove() OK")
+
+
+def test5(num_cbs=2000, seed=0):
+    """
+    This method checks cbs with multi-event frames (see frames.py). Random
+    cbs, whose frames have 1 or 2 events of a small vocabulary (and, for
+    some of them, a repeated event), are added
+    to a CbLibXColl, and the collection must be the one obtained by adding
+    them one at a time with cb1_is_smaller_that_cb2(). The arrow counts and
+    dataset of the largest cbLibX must agree with dot_for_cb() and with the
+    events of its cbs.
+
+    Parameters
+    ----------
+    num_cbs: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    rng = random.Random(seed)
+    events = ['e' + str(i) for i in range(8)]
+
+    def random_multi_event_cb():
+        cb_events = rng.sample(events, rng.randint(1, 5))
+        cb = []
+        while cb_events:
+            frame = cb_events[:rng.randint(1, 2)]
+            cb_events = cb_events[len(frame):]
+            cb.append(frame[0] if len(frame) == 1 else frame)
+        return cb
+
+    def random_repeated_event_cb():
+        cb = random_multi_event_cb()
+        cb.insert(rng.randint(0, len(cb)), rng.choice(events[:4]))
+        return cb
+
+    # a head with a repeated event: ['a', 'c'] is not smaller than it,
+    # since 'a' occurs twice in it (as for single-event cbs)
+    coll = CbLibXColl()
+    coll.add_cbs([[['a', 'b'], 'a', 'c'], ['b', 'c'], ['a', 'c'],
+                  ['c', 'b']])
+    assert coll.coll_of_cbLibXs == [[[['a', 'b'], 'a', 'c'], ['b', 'c']],
+                                    [['a', 'c']], [['c', 'b']]]
+
+    cbs = [random_multi_event_cb() if rng.random() < .8
+           else random_repeated_event_cb() for _ in range(num_cbs)]
+    coll = CbLibXColl()
+    coll.add_cbs(cbs)
+
+    coll_of_cbLibXs = []
+    num_republished_cbs = 0
+    cb_set = set()
+    for cb in cbs:
+        if get_cb_key(cb) in cb_set:
+            num_republished_cbs += 1
+            continue
+        cb_set.add(get_cb_key(cb))
+        has_home = False
+        for cbLibX in coll_of_cbLibXs:
+            if cb1_is_smaller_that_cb2(cb, cbLibX[0]):
+                cbLibX.append(cb)
+                has_home = True
+        if not has_home:
+            coll_of_cbLibXs.append([cb])
+    assert coll.coll_of_cbLibXs == coll_of_cbLibXs
+    assert coll.num_republished_cbs == num_republished_cbs
+
+    cbLibX = max(coll_of_cbLibXs, key=len)
+    arrow_freq_dict = {}
+    for cb in cbLibX:
+        for arrow in dot_for_cb(cb, 2)[1]:
+            arrow_freq_dict[arrow] = arrow_freq_dict.get(arrow, 0) + 1
+    assert get_arrow_freq_dict(cbLibX, 2) == arrow_freq_dict
+    columns = get_dataset_columns(cbLibX)
+    matrix = get_dataset_matrix(cbLibX)
+    for row, cb in zip(matrix, cbLibX):
+        assert set(np.array(columns)[row]) == \
+            set(columns) & set(get_cb_events(cb)[0])
+    print("test5: multi-event frames OK,", len(coll_of_cbLibXs), "cbLibXs")
+
+
+def test6(num_created_cbs=3000, num_workers=4, seed=7):
+    """
+    This method checks create_parallel_coll_of_cbLibXs(). With one worker,
+    it must return the collection of create_coll_of_cbLibXs(), and with
+    'num_workers' workers, the collection obtained by inserting the cbs of
+    each shard, in shard order, into a single CbLibXColl.
+
+    Parameters
+    ----------
+    num_created_cbs: int
+    num_workers: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    parallel = create_parallel_coll_of_cbLibXs(num_created_cbs, 1, seed)
+    random.seed(seed)
+    assert parallel == create_coll_of_cbLibXs(num_created_cbs)
+
+    parallel = create_parallel_coll_of_cbLibXs(num_created_cbs,
+                                               num_workers, seed)
+    coll = CbLibXColl()
+    for k in range(num_workers):
+        random.seed(seed + k)
+        shard_size = num_created_cbs // num_workers + \
+            int(k < num_created_cbs % num_workers)
+        coll.add_cbs([create_cb() for _ in range(shard_size)])
+    assert parallel == (coll.coll_of_cbLibXs, coll.num_republished_cbs)
+    print("test6: parallel collection OK,", len(parallel[0]), "cbLibXs")
+
+
+def test7(num_created_cbs=2000, seed=21):
+    """
+    This method checks that create_indexed_coll_of_cbLibXs() returns the
+    same collection of cbLibXs and the same number of republished cbs as
+    create_coll_of_cbLibXs(), for the same seed.
+
+    Parameters
+    ----------
+    num_created_cbs: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    random.seed(seed)
+    serial = create_coll_of_cbLibXs(num_created_cbs)
+    random.seed(seed)
+    indexed = create_indexed_coll_of_cbLibXs(num_created_cbs)
+    assert indexed == serial
+    print("test7: indexed collection OK,", len(indexed[0]), "cbLibXs,",
+          indexed[1], "republished cbs")
+
+
+def test8(num_created_cbs=3000, seed=0):
+    """
+    This method checks the bitboard version of cb.py against the original
+    list[str] version: bitboard_to_cb() must invert cb_to_bitboard(),
+    cb_has_ended() must agree with a check of the 16 winning patterns of
+    events on every prefix of every cb, and create_cb() must create the
+    same cbs as the original create_cb() for the same seed.
+
+    Parameters
+    ----------
+    num_created_cbs: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    winning_patterns = [[player + str(pos) for pos in pattern]
+                        for player in 'XO'
+                        for pattern in [[0, 1, 2], [3, 4, 5], [6, 7, 8],
+                                        [0, 3, 6], [1, 4, 7], [2, 5, 8],
+                                        [0, 4, 8], [2, 4, 6]]]
+
+    def old_cb_has_ended(cb):
+        if len(cb) == 9:
+            return True
+        return any(set(pattern).issubset(set(cb))
+                   for pattern in winning_patterns)
+
+    def old_create_cb():
+        cb = ['X' + str(random.randrange(9))]
+        while not old_cb_has_ended(cb):
+            occupied_spaces = set([int(x[1]) for x in cb])
+            empty_spaces = set(range(9)) - occupied_spaces
+            next_player = 'X' if cb[-1][0] == 'O' else 'O'
+            cb.append(next_player + str(random.choice(list(empty_spaces))))
+        return cb
+
+    random.seed(seed)
+    cbs = [create_cb() for _ in range(num_created_cbs)]
+    random.seed(seed)
+    assert cbs == [old_create_cb() for _ in range(num_created_cbs)]
+    for cb in cbs:
+        assert bitboard_to_cb(*cb_to_bitboard(cb)) == cb
+        for time in range(1, len(cb) + 1):
+            assert cb_has_ended(cb[:time]) == old_cb_has_ended(cb[:time])
+    print("test8: bitboards OK")
+
+
+def test9(num_cbs=500, memory_time=2, arr_rep_th=3):
+    """
+    This method checks arrow_counts.py and the dot strings of dot.py.
+    count_arrows() and ArrowCounter (after adding and removing cbs) must
+    give the arrow frequency dictionary of the arrows of dot_for_cb(), and
+    dot_for_cb() and dot_for_high_freq_arrows_DAG() must return the same
+    dot strings as their original versions, which built them by repeated
+    concatenation.
+
+    Parameters
+    ----------
+    num_cbs: int
+    memory_time: int
+    arr_rep_th: int
+
+    Returns
+    -------
+    None
+
+    """
+    def old_dot_for_cb(cb, memory_time, graph_name, is_subgraph):
+        dot = "subgraph {\n" if is_subgraph else "digraph {\n"
+        for event_i, event in enumerate(cb):
+            for delta in range(memory_time):
+                j = event_i - delta - 1
+                if j >= 0:
+                    if not is_subgraph:
+                        dot += cb[j] + " -> " + event + ';\n'
+                    else:
+                        dot += cb[j] + "_" + graph_name + \
+                               " -> " + \
+                               event + "_" + graph_name + ';\n'
+        return dot + "}\n"
+
+    def old_dot_for_high_freq_arrows_DAG(arrow_freq_dict, arr_rep_th):
+        dot = "digraph {\n"
+        for arrow, freq in arrow_freq_dict.items():
+            if freq >= arr_rep_th:
+                dot += arrow[0] + " -> " + arrow[1] + \
+                    ' [label=' + str(freq) + "];\n"
+        return dot + "}\n"
+
+    cbs = cb_batch_to_cbs(*create_cb_batch(num_cbs, seed=0))
+    arrow_freq_dict = {}
+    for cb in cbs:
+        for is_subgraph in [False, True]:
+            assert dot_for_cb(cb, memory_time, 'g', is_subgraph)[0] == \
+                old_dot_for_cb(cb, memory_time, 'g', is_subgraph)
+        for arrow in dot_for_cb(cb, memory_time)[1]:
+            arrow_freq_dict[arrow] = arrow_freq_dict.get(arrow, 0) + 1
+    assert count_matrix_to_arrow_freq_dict(
+        count_arrows(cbs, memory_time)) == arrow_freq_dict
+    counter = ArrowCounter(memory_time, cbs)
+    counter.add_cbs(cbs[:100])
+    counter.remove_cbs(cbs[:100])
+    assert counter.get_arrow_freq_dict() == arrow_freq_dict
+    assert dot_for_high_freq_arrows_DAG(arrow_freq_dict, arr_rep_th)[0] == \
+        old_dot_for_high_freq_arrows_DAG(arrow_freq_dict, arr_rep_th)
+    print("test9: arrow counts and dot strings OK")
+
+
+def test10(num_arrow_lists=2000, seed=0):
+    """
+    This method checks the DAG class on random lists of arrows (which can
+    have repeated arrows and cycles). The nodes and parents must be the
+    ones found by the original loops of BayesNet over all the arrows for
+    every node, the topological order must put every node after its
+    parents, and it must be None iff a depth first search finds a cycle.
+
+    Parameters
+    ----------
+    num_arrow_lists: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    rng = random.Random(seed)
+    names = ['a', 'b', 'c', 'd', 'e', 'f']
+
+    def has_cycle(nodes, nd_to_parents):
+        # 1 = being visited, 2 = done
+        nd_to_state = {}
+
+        def visit(nd):
+            nd_to_state[nd] = 1
+            for pa_nd in nd_to_parents[nd]:
+                state = nd_to_state.get(pa_nd)
+                if state == 1 or (state is None and visit(pa_nd)):
+                    return True
+            nd_to_state[nd] = 2
+            return False
+        return any(nd not in nd_to_state and visit(nd) for nd in nodes)
+
+    num_cyclic = 0
+    for _ in range(num_arrow_lists):
+        arrows = [(rng.choice(names), rng.choice(names))
+                  for _ in range(rng.randint(1, 8))]
+        nodes = []
+        for arrow in arrows:
+            for i in [0, 1]:
+                if arrow[i] not in nodes:
+                    nodes.append(arrow[i])
+        nd_to_parents = {nd: [] for nd in nodes}
+        for arrow in arrows:
+            for nd in nodes:
+                if arrow[1] == nd:
+                    if arrow[0] not in nd_to_parents[nd]:
+                        nd_to_parents[nd].append(arrow[0])
+        dag = DAG(arrows)
+        assert dag.nodes == nodes
+        assert dag.nd_to_parents == nd_to_parents
+        assert dag.has_cycle() == has_cycle(nodes, nd_to_parents)
+        if dag.has_cycle():
+            num_cyclic += 1
+            continue
+        assert sorted(dag.topological_order) == sorted(nodes)
+        position = {nd: i for i, nd in enumerate(dag.topological_order)}
+        for nd in nodes:
+            for pa_nd in nd_to_parents[nd]:
+                assert position[pa_nd] < position[nd]
+    print("test10: DAG OK,", num_cyclic, "graphs with cycles")
+
+
+def test11(num_pairs=100000, num_heads=500, seed=0):
+    """
+    This method checks the memoized cb1_is_smaller_that_cb2() against the
+    original set based version, on 'num_pairs' random pairs of event lists
+    (with repeated events, since the events are drawn from only a few), and
+    on every smaller cb (see get_smaller_cbs()) of 'num_heads' random
+    games. It also checks cb_batch.cb_is_smaller_than_each() against
+    cb1_is_smaller_that_cb2() on the same games.
+
+    Parameters
+    ----------
+    num_pairs: int
+    num_heads: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    def old_cb1_is_smaller_that_cb2(cb1, cb2):
+        if set(cb1) == set(cb2) or set(cb1).issuperset(cb2):
+            return False
+        cb2_ = [x for x in cb2 if x in cb1]
+        return cb1 == cb2_
+
+    rng = random.Random(seed)
+    events = EVENTS[:5]
+    for _ in range(num_pairs):
+        cb1 = [rng.choice(events) for _ in range(rng.randint(0, 5))]
+        cb2 = [rng.choice(events) for _ in range(rng.randint(0, 7))]
+        assert cb1_is_smaller_that_cb2(cb1, cb2) == \
+            old_cb1_is_smaller_that_cb2(cb1, cb2)
+
+    heads = cb_batch_to_cbs(*create_cb_batch(num_heads, seed=seed))
+    for head in heads:
+        for cb in get_smaller_cbs(head):
+            assert cb1_is_smaller_that_cb2(list(cb), head)
+            assert old_cb1_is_smaller_that_cb2(list(cb), head)
+    event_times_matrix = get_event_times_matrix(heads)
+    cbs = heads[:100] + [list(cb) for head in heads[:20]
+                         for cb in get_smaller_cbs(head)]
+    for cb in cbs:
+        assert cb_is_smaller_than_each(cb, event_times_matrix).tolist() == \
+            [cb1_is_smaller_that_cb2(cb, head) for head in heads]
+    print("test11: cb comparisons OK")
+
+
+def test12(num_cbs=3000, seed=0):
+    """
+    This method checks that cb_to_latex(), which fills the cells of the
+    grid from get_cell_labels() (shared with grid_rendering.py), returns
+    the same latex strings as its original version, which replaced the
+    placeholder of each cell one at a time, on all the prefixes of
+    'num_cbs' random cbs.
+
+    Parameters
+    ----------
+    num_cbs: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    def old_cb_to_latex(cb):
+        latex = r"\setlength\arrayrulewidth{2pt}" \
+                r"\begin{tabular}{c|c|c}" \
+                r"00&11&22\\\hline " \
+                r"33&44&55\\\hline " \
+                r"66&77&88\end{tabular}"
+        used_pos = []
+        for time, frame in enumerate(cb):
+            latex = latex.replace(frame[1]*2,
+                                  frame[0] + '(' + str(time) + ')')
+            used_pos.append(int(frame[1]))
+        for pos in [str(i) for i in range(9) if i not in used_pos]:
+            latex = latex.replace(pos*2, '')
+        return latex
+
+    for cb in cb_batch_to_cbs(*create_cb_batch(num_cbs, seed=seed)):
+        for time in range(len(cb) + 1):
+            assert cb_to_latex(cb[:time]) == old_cb_to_latex(cb[:time])
+    print("test12: latex strings OK")
+
+
+def test13(num_created_cbs=3000, seed=0):
+    """
+    This method checks the move policies. With the default policy,
+    create_cb() must create the same cbs as repeated calls of next_frame()
+    after a random first move, as the original create_cb() did, for the
+    same seed. The minimax table must have the 5,478 reachable positions
+    and value 0 for the empty grid, minimax self-play must always end in a
+    draw, and a minimax player must never lose against a random one.
+
+    Parameters
+    ----------
+    num_created_cbs: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    def old_create_cb():
+        cb = ['X' + str(random.randrange(9))]
+        while not cb_has_ended(cb):
+            cb.append(next_frame(cb))
+        return cb
+
+    def get_winner(cb):
+        x_mask, o_mask, _ = cb_to_bitboard(cb)
+        if MASK_HAS_WIN[x_mask]:
+            return 'X'
+        if MASK_HAS_WIN[o_mask]:
+            return 'O'
+        return None
+
+    random.seed(seed)
+    cbs = [create_cb() for _ in range(num_created_cbs)]
+    random.seed(seed)
+    assert cbs == [old_create_cb() for _ in range(num_created_cbs)]
+
+    table = get_minimax_table()
+    assert len(table) == 5478
+    assert table[0, 0][0] == 0
+    random.seed(seed)
+    for policy in [minimax_policy, EpsilonGreedyPolicy(0)]:
+        for _ in range(200):
+            cb = create_cb(policy)
+            assert len(cb) == 9 and get_winner(cb) is None
+    for minimax_player in [0, 1]:
+        def policy(x_mask, o_mask, player):
+            if player == minimax_player:
+                return minimax_policy(x_mask, o_mask, player)
+            return random_policy(x_mask, o_mask, player)
+        for _ in range(500):
+            assert get_winner(create_cb(policy)) != 'XO'[1 - minimax_player]
+    print("test13: move policies OK")
+
+
+def test14(num_created_cbs=30000, seed=21):
+    """
+    This method checks that spilling closed cbLibXs (see CbLibXColl) does
+    not change the collection: the spilled file, read back with
+    read_spilled_cbLibXs(), must contain the same cbLibXs, with the same
+    indices, as the collection built in memory from the same cbs. It also
+    checks that, when spilling is on, adding a cb that is not a completed
+    Tic-Tac-Toe game fails.
+
+    Parameters
+    ----------
+    num_created_cbs: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    import os
+    import tempfile
+
+    random.seed(seed)
+    cbs = [create_cb() for _ in range(num_created_cbs)]
+    coll = CbLibXColl()
+    coll.add_cbs(cbs)
+    with tempfile.TemporaryDirectory() as dir_name:
+        spill_path = os.path.join(dir_name, "spill.jsonl")
+        create_streamed_coll_of_cbLibXs(cbs, spill_path)
+        lib_to_cbLibX = dict(read_spilled_cbLibXs(spill_path))
+        spilling_coll = CbLibXColl(os.path.join(dir_name, "other.jsonl"))
+        for cb in [['X0', 'O1'], [['X0', 'O1']]]:
+            try:
+                spilling_coll.add_cb(cb)
+            except AssertionError:
+                continue
+            assert False, "spilling accepted " + str(cb)
+        spilling_coll.close()
+    assert sorted(lib_to_cbLibX) == list(range(len(coll.coll_of_cbLibXs)))
+    assert [lib_to_cbLibX[lib] for lib in sorted(lib_to_cbLibX)] == \
+        coll.coll_of_cbLibXs
+    print("test14: spilled collection OK,", len(lib_to_cbLibX), "cbLibXs")
+
+
+def test15(num_created_cbs=3000, seed=0):
+    """
+    This method checks cb_storage.py: the collection of cbLibXs saved with
+    write_coll_of_cbLibXs() must be read back, cbLibX by cbLibX, by
+    gen_cbLibXs_from_dir(), and the cbs saved with write_cbs() must be read
+    back by gen_cbs_from_file().
+
+    Parameters
+    ----------
+    num_created_cbs: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    import os
+    import tempfile
+    from cb_storage import write_coll_of_cbLibXs, gen_cbLibXs_from_dir, \
+        write_cbs, gen_cbs_from_file
+
+    random.seed(seed)
+    cbs = [create_cb() for _ in range(num_created_cbs)]
+    coll = CbLibXColl()
+    coll.add_cbs(cbs)
+    coll_of_cbLibXs = coll.coll_of_cbLibXs
+    with tempfile.TemporaryDirectory() as dir_name:
+        coll_dir = os.path.join(dir_name, "coll")
+        write_coll_of_cbLibXs(coll_dir, coll_of_cbLibXs)
+        assert list(gen_cbLibXs_from_dir(coll_dir)) == coll_of_cbLibXs
+        cbs_path = os.path.join(dir_name, "cbs.npy")
+        write_cbs(cbs_path, cbs)
+        assert list(gen_cbs_from_file(cbs_path)) == cbs
+    print("test15: stored collection OK,", len(coll_of_cbLibXs), "cbLibXs")
+
+
+def test16(num_created_cbs=3000, memory_time=2, seed=0):
+    """
+    This method checks the batched high frequency arrows of arrow_counts.py.
+    For each cbLibX of a collection, and for several arrow repetition
+    thresholds, get_high_freq_arrows_batch() must return the same arrows
+    (up to their order) as dot_for_high_freq_arrows_DAG() applied to the
+    arrow frequency dictionary built from the arrows of dot_for_cb().
+
+    Parameters
+    ----------
+    num_created_cbs: int
+    memory_time: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    random.seed(seed)
+    coll = CbLibXColl()
+    coll.add_cbs([create_cb() for _ in range(num_created_cbs)])
+    count_tensor = count_arrows_for_coll(coll.coll_of_cbLibXs, memory_time)
+    lib_to_arrow_freq_dict = []
+    for cbLibX in coll.coll_of_cbLibXs:
+        arrow_freq_dict = {}
+        for cb in cbLibX:
+            for arrow in dot_for_cb(cb, memory_time)[1]:
+                arrow_freq_dict[arrow] = arrow_freq_dict.get(arrow, 0) + 1
+        lib_to_arrow_freq_dict.append(arrow_freq_dict)
+    for arr_rep_th in [0, 1, 2, 3]:
+        batch_arrows = get_high_freq_arrows_batch(count_tensor, arr_rep_th)
+        assert len(batch_arrows) == len(coll.coll_of_cbLibXs)
+        for arrows, arrow_freq_dict in zip(batch_arrows,
+                                           lib_to_arrow_freq_dict):
+            _, hfa_arrows = dot_for_high_freq_arrows_DAG(arrow_freq_dict,
+                                                         arr_rep_th)
+            assert len(arrows) == len(hfa_arrows)
+            assert set(arrows) == set(hfa_arrows)
+    print("test16: batched high frequency arrows OK")
+
+
+def test17(num_rows=300, seed=0):
+    """
+    This method checks BayesNetInference against brute force inference on
+    a small bnet: the joint probability of every state of the nodes is
+    computed as the product of the TPM entries, and the marginals
+    (get_marginals()) and the conditionals (query_batch() and query()) are
+    then obtained by summing it.
+
+    Parameters
+    ----------
+    num_rows: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    from itertools import product
+    from BayesNetInference import BayesNetInference
+
+    rng = np.random.default_rng(seed)
+    columns = ['X0', 'O1', 'X2', 'O3', 'X4']
+    packed_dataset = pack_dataset(rng.random((num_rows, 5)) <
+                                  rng.random((5,)))
+    arrows = [('X0', 'O1'), ('X0', 'X2'), ('O1', 'O3'), ('X2', 'O3'),
+              ('O3', 'X4')]
+    bnet = BayesNet(arrows, packed_dataset=packed_dataset, columns=columns,
+                    pseudo_count=1)
+    nodes = bnet.nodes
+    joint = {}
+    for st in product((0, 1), repeat=len(nodes)):
+        nd_to_st = dict(zip(nodes, st))
+        prob = 1.
+        for nd in nodes:
+            pa_st = tuple(nd_to_st[pa_nd] for pa_nd in bnet.nd_to_parents[nd])
+            prob *= bnet.get_TPM(nd)[pa_st][nd_to_st[nd]]
+        joint[st] = prob
+    assert np.isclose(sum(joint.values()), 1)
+
+    def brute_force_query(nd, evidence):
+        probs = np.zeros((2,))
+        for st, prob in joint.items():
+            nd_to_st = dict(zip(nodes, st))
+            if all(nd_to_st[ev_nd] == ev_st
+                   for ev_nd, ev_st in evidence.items()):
+                probs[nd_to_st[nd]] += prob
+        return probs / probs.sum()
+
+    inference = BayesNetInference(bnet)
+    for nd, marginal in inference.get_marginals().items():
+        assert np.allclose(marginal, brute_force_query(nd, {}))
+    for nd in nodes:
+        for evidence_nodes in [['X4'], ['X0', 'X4'], ['O1', 'X2']]:
+            if nd in evidence_nodes:
+                continue
+            evidence_values = np.array(
+                list(product((0, 1), repeat=len(evidence_nodes))))
+            probs = inference.query_batch(nd, evidence_nodes,
+                                          evidence_values)
+            for row, values in zip(probs, evidence_values.tolist()):
+                evidence = dict(zip(evidence_nodes, values))
+                expected = brute_force_query(nd, evidence)
+                assert np.allclose(row, expected)
+                assert np.allclose(inference.query(nd, evidence), expected)
+    print("test17: inference OK")
+
+
+def test18(num_rows=300, num_samples=200000, seed=0):
+    """
+    This method checks get_log_likelihood() and sample() of BayesNet on a
+    small bnet. The log-likelihood of each row must be the sum of the logs
+    of its TPM entries, and the frequency of each state of the nodes in
+    the samples must be close to its joint probability, i.e., the product
+    of its TPM entries.
+
+    Parameters
+    ----------
+    num_rows: int
+    num_samples: int
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    from itertools import product
+
+    rng = np.random.default_rng(seed)
+    columns = ['X0', 'O1', 'X2', 'O3', 'X4']
+    matrix = (rng.random((num_rows, 5)) < rng.random((5,))).astype(np.uint8)
+    arrows = [('X0', 'O1'), ('X0', 'X2'), ('O1', 'O3'), ('X2', 'O3'),
+              ('O3', 'X4')]
+    bnet = BayesNet(arrows, packed_dataset=pack_dataset(matrix),
+                    columns=columns, pseudo_count=1)
+
+    def get_log_prob(nd_to_st):
+        log_prob = 0.
+        for nd in bnet.nodes:
+            pa_st = tuple(nd_to_st[pa_nd] for pa_nd in bnet.nd_to_parents[nd])
+            log_prob += np.log(bnet.get_TPM(nd)[pa_st][nd_to_st[nd]])
+        return log_prob
+
+    log_probs = bnet.get_log_likelihood(matrix, columns, per_row=True)
+    expected = [get_log_prob(dict(zip(columns, row)))
+                for row in matrix.tolist()]
+    assert np.allclose(log_probs, expected)
+    assert np.isclose(bnet.get_log_likelihood(matrix, columns),
+                      sum(expected))
+
+    samples = bnet.sample(num_samples, seed=seed)
+    assert samples.shape == (num_samples, len(bnet.nodes))
+    assert (bnet.sample(1000, seed=seed) ==
+            bnet.sample(1000, seed=seed)).all()
+    state_indices = samples.astype(np.int64) @ \
+        (2 ** np.arange(len(bnet.nodes))[::-1])
+    freqs = np.bincount(state_indices, minlength=2 ** len(bnet.nodes)) / \
+        num_samples
+    for i, st in enumerate(product((0, 1), repeat=len(bnet.nodes))):
+        prob = np.exp(get_log_prob(dict(zip(bnet.nodes, st))))
+        assert abs(freqs[i] - prob) < 4 * np.sqrt(prob / num_samples) + \
+            1e-3, (st, freqs[i], prob)
+    print("test18: log-likelihood and sampling OK")
+
+
+def test19(num_created_cbs=3000, memory_time=2, pseudo_count=0, seed=0):
+    """
+    This method checks threshold_sweep.py on the largest cbLibXs of a
+    collection. For each threshold of sweep_arr_rep_th(), the hfa bnet
+    plus the independent columns must give the same log-likelihood as
+    BayesNet.get_log_likelihood() and get_independent_log_likelihood()
+    applied to the dataset matrix, and all the scores must be python
+    floats. get_best_arr_rep_th() must return the row with the highest
+    BIC.
+
+    Parameters
+    ----------
+    num_created_cbs: int
+    memory_time: int
+    pseudo_count: float
+    seed: int
+
+    Returns
+    -------
+    None
+
+    """
+    from threshold_sweep import sweep_arr_rep_th, get_best_arr_rep_th, \
+        get_independent_log_likelihood
+
+    random.seed(seed)
+    coll = CbLibXColl()
+    coll.add_cbs([create_cb() for _ in range(num_created_cbs)])
+    cbLibXs = sorted(coll.coll_of_cbLibXs, key=len, reverse=True)[:5]
+    for cbLibX in cbLibXs:
+        arrow_freq_dict = get_arrow_freq_dict(cbLibX, memory_time)
+        matrix = get_dataset_matrix(cbLibX)
+        columns = get_dataset_columns(cbLibX)
+        col_to_indep_ll = dict(zip(columns,
+                                   get_independent_log_likelihood(matrix)))
+        rows = sweep_arr_rep_th(cbLibX, memory_time, pseudo_count)
+        assert rows
+        assert [row[0] for row in rows] == sorted(row[0] for row in rows)
+        for arr_rep_th, num_arrows, log_likelihood, bic in rows:
+            assert type(log_likelihood) is float and type(bic) is float
+            _, arrows = dot_for_high_freq_arrows_DAG(arrow_freq_dict,
+                                                     arr_rep_th)
+            assert num_arrows == len(arrows)
+            bnet = BayesNet(arrows, packed_dataset=pack_dataset(matrix),
+                            columns=columns, pseudo_count=pseudo_count)
+            expected = bnet.get_log_likelihood(matrix, columns) + \
+                sum(col_to_indep_ll[col] for col in columns
+                    if col not in bnet.nd_to_TPM)
+            assert np.isclose(log_likelihood, expected)
+            assert bic <= log_likelihood
+        best_arr_rep_th, best_bic = get_best_arr_rep_th(
+            cbLibX, memory_time, pseudo_count)
+        assert (best_arr_rep_th, best_bic) == \
+            max(rows, key=lambda row: row[3])[::3]
+    print("test19: threshold sweep OK")
 
 
 if __name__ == "__main__":
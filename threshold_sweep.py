@@ -0,0 +1,178 @@
+import numpy as np
+from arrow_counts import *
+from dataset import *
+from BayesNet import *
+from profiling import *
+
+"""These are methods for choosing the arrow repetition threshold
+'arr_rep_th' of dot.dot_for_high_freq_arrows_DAG() automatically, instead of
+by hand. For a cbLibX, the arrow counts are computed once, and then, for
+every threshold, the high frequency arrows (hfa) DAG is built, upgraded to
+a bnet, and scored with the BIC (Bayesian Information Criterion)
+
+    BIC = log-likelihood - (num_params / 2) * log(num_rows).
+
+All the bnets of a sweep share the same counts cache (see BayesNet), so
+the counts of each family are computed only once, and the log-likelihood
+is computed from those counts, without another pass over the dataset.
+
+The nodes of the hfa DAG are only the events that have arrows, so, to
+make the scores of different thresholds comparable, every other column of
+the dataset is scored as an independent node with a single parameter. """
+
+
+def get_bnet_log_likelihood(bnet):
+    """
+    This method returns the log-likelihood of the dataset of 'bnet' under
+    'bnet', computed from the counts of its families.
+
+    Parameters
+    ----------
+    bnet: BayesNet
+
+    Returns
+    -------
+    float
+
+    """
+    log_likelihood = 0.
+    for nd in bnet.nodes:
+        counts = bnet.get_counts(nd)
+        probs = bnet.get_TPM(nd, as_array=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_likelihood += np.where(counts > 0,
+                                       counts * np.log(probs), 0.).sum()
+    return float(log_likelihood)
+
+
+def get_independent_log_likelihood(matrix):
+    """
+    This method returns, for each column of the dataset matrix 'matrix',
+    the log-likelihood of that column when it is modelled as an
+    independent node (with its empirical probability of being 1).
+
+    Parameters
+    ----------
+    matrix: np.array[bool]
+
+    Returns
+    -------
+    np.array[float]
+
+    """
+    num_rows = len(matrix)
+    num_ones = np.asarray(matrix, dtype=np.int64).sum(axis=0)
+    num_zeros = num_rows - num_ones
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(num_ones > 0,
+                        num_ones * np.log(num_ones / num_rows), 0.) + \
+            np.where(num_zeros > 0,
+                     num_zeros * np.log(num_zeros / num_rows), 0.)
+
+
+@profiled()
+def sweep_arr_rep_th(cbLibX, memory_time, pseudo_count=0):
+    """
+    This method scores the hfa DAG of 'cbLibX' for every arrow repetition
+    threshold that gives a different DAG, i.e., for every distinct
+    arrow frequency. Thresholds whose hfa DAG has a cycle can't be
+    upgraded to a bnet, so they are skipped.
+
+    Parameters
+    ----------
+    cbLibX: list[list[str | list[str]]]
+    memory_time: int
+    pseudo_count: float
+        see BayesNet
+
+    Returns
+    -------
+    list[(int, int, float, float)]
+        list of (arr_rep_th, num_arrows, log_likelihood, bic), one for
+        each threshold, in increasing order of threshold
+
+    """
+    arrow_freq_dict = get_arrow_freq_dict(cbLibX, memory_time)
+    matrix = get_dataset_matrix(cbLibX)
+    columns = get_dataset_columns(cbLibX)
+    packed_dataset = pack_dataset(matrix)
+    col_to_indep_ll = dict(zip(columns,
+                               get_independent_log_likelihood(matrix)))
+    log_num_rows = np.log(len(cbLibX))
+    counts_cache = {}
+    rows = []
+    for arr_rep_th in sorted(set(arrow_freq_dict.values())):
+        _, arrows = dot_for_high_freq_arrows_DAG(arrow_freq_dict,
+                                                 arr_rep_th)
+        if DAG(arrows).has_cycle():
+            continue
+        bnet = BayesNet(arrows,
+                        packed_dataset=packed_dataset,
+                        columns=columns,
+                        pseudo_count=pseudo_count,
+                        counts_cache=counts_cache)
+        indep_cols = [col for col in columns if col not in bnet.nd_to_TPM]
+        log_likelihood = get_bnet_log_likelihood(bnet) + \
+            sum(col_to_indep_ll[col] for col in indep_cols)
+        num_params = len(indep_cols) + \
+            sum(2**len(bnet.nd_to_parents[nd]) for nd in bnet.nodes)
+        bic = log_likelihood - num_params * log_num_rows / 2
+        rows.append((arr_rep_th, len(arrows), float(log_likelihood),
+                     float(bic)))
+    return rows
+
+
+def get_best_arr_rep_th(cbLibX, memory_time, pseudo_count=0):
+    """
+    This method returns the arrow repetition threshold with the highest
+    BIC for 'cbLibX' (see sweep_arr_rep_th()), and its BIC. If no
+    threshold can be scored, it returns (None, None).
+
+    Parameters
+    ----------
+    cbLibX: list[list[str]]
+    memory_time: int
+    pseudo_count: float
+
+    Returns
+    -------
+    int | None, float | None
+
+    """
+    rows = sweep_arr_rep_th(cbLibX, memory_time, pseudo_count)
+    if not rows:
+        return None, None
+    best_row = max(rows, key=lambda row: row[3])
+    return best_row[0], best_row[3]
+
+
+def sweep_coll_of_cbLibXs(coll_of_cbLibXs, memory_time,
+                          num_workers=1, pseudo_count=0):
+    """
+    This method runs get_best_arr_rep_th() for every cbLibX in
+    'coll_of_cbLibXs', in parallel over 'num_workers' processes, and
+    returns a table of the best thresholds.
+
+    Parameters
+    ----------
+    coll_of_cbLibXs: list[list[list[str]]]
+    memory_time: int
+    num_workers: int
+    pseudo_count: float
+
+    Returns
+    -------
+    list[(int, int | None, float | None)]
+        list of (lib_index, best_arr_rep_th, best_bic), one for each
+        cbLibX
+
+    """
+    args = [(cbLibX, memory_time, pseudo_count)
+            for cbLibX in coll_of_cbLibXs]
+    if num_workers == 1:
+        results = [get_best_arr_rep_th(*arg) for arg in args]
+    else:
+        from multiprocessing import Pool
+        with Pool(num_workers) as pool:
+            results = pool.starmap(get_best_arr_rep_th, args)
+    return [(lib,) + result for lib, result in enumerate(results)]